@@ -50,14 +50,18 @@ from urllib.parse import urlparse, parse_qs
 import pandas as pd
 import numpy as np
 import os
+import sys
 import json
+import re
 import time
 import logging
-import traceback
+import itertools
+import threading
+import signal
 from typing import Dict, List, Optional, Tuple, Any, Set
-from functools import lru_cache
+from dataclasses import dataclass
 from contextlib import contextmanager
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 import multiprocessing
 import base64
 
@@ -68,8 +72,10 @@ import mysql.connector
 from mysql.connector import pooling
 
 from sqlalchemy import (
-    create_engine, Table, Column, MetaData, String, Integer, Float, DateTime, Text, text
+    create_engine, Table, Column, Computed, Index, MetaData, String, Integer, Float, Date, DateTime, Text, text
 )
+from sqlalchemy.dialects import mysql as mysql_dialect
+from sqlalchemy.dialects.mysql import TINYINT
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.pool import QueuePool
 
@@ -88,6 +94,21 @@ try:
 except ImportError:
     QStash = None
 
+# --- Optional: orjson (faster parsing of large Shopify payloads) ---
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_loads(raw):
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def _json_dumps_body(obj):
+    """Serialize an HTTP request body (compact bytes with orjson, stdlib str otherwise)."""
+    return orjson.dumps(obj) if orjson is not None else json.dumps(obj)
+
 # ---- Logging ----
 logging.basicConfig(
     level=logging.INFO,
@@ -105,6 +126,20 @@ TEST_MODE = os.environ.get("TEST_MODE", "false").strip().lower() == "true"
 if TEST_MODE:
     logger.info("⚠️ TEST_MODE enabled: QStash and DB SSL will be DISABLED, loading config from local env.")
 
+# Bulk-load order rows with LOAD DATA LOCAL INFILE (falls back to to_sql when the server refuses it or flags bad rows)
+USE_LOAD_DATA_INFILE = os.environ.get("USE_LOAD_DATA_INFILE", "true").strip().lower() == "true"
+
+# Skip unique/foreign-key checks for the session doing a bulk order load (restored afterwards)
+BULK_LOAD_RELAX_CHECKS = os.environ.get("BULK_LOAD_RELAX_CHECKS", "true").strip().lower() == "true"
+_BULK_LOAD_RELAX_SQL = "SET SESSION unique_checks=0, foreign_key_checks=0"
+_BULK_LOAD_RESTORE_SQL = "SET SESSION unique_checks=1, foreign_key_checks=1"
+
+# Materialize the affected orders window once per refresh and aggregate every summary from it
+USE_SUMMARY_WINDOWS = os.environ.get("USE_SUMMARY_WINDOWS", "true").strip().lower() == "true"
+
+# Range-partition the order tables by month on their summary date key (one-off table rebuild when first enabled)
+PARTITION_ORDER_TABLES = os.environ.get("PARTITION_ORDER_TABLES", "false").strip().lower() == "true"
+
 brand_tag_to_index_map: Dict[str, int] = {}
 brand_id_from_config: Dict[int, int] = {}  # brand_index -> brand_id from pipelinecreds MongoDB
 db_connection_pools: Dict[int, pooling.MySQLConnectionPool] = {}
@@ -359,12 +394,14 @@ def ts() -> str:
 
 @contextmanager
 def timed(label: str):
-    t0 = time.perf_counter()
+    if not logger.isEnabledFor(logging.INFO):
+        yield
+        return
+    t0 = time.perf_counter_ns()
     try:
         yield
     finally:
-        dt = time.perf_counter() - t0
-        logger.info(f"⏱️ {label} took {dt:.2f}s")
+        logger.info("⏱️ %s took %.2fs", label, (time.perf_counter_ns() - t0) / 1e9)
 
 def enable_session_profiling(cursor) -> bool:
     try:
@@ -539,11 +576,15 @@ def initialize_brand_configs():
         # --------------------------
         # 1. Connection Pool (Retry with SSL fallback)
         # --------------------------
+        # pool_reset_session=False: skip the COM_RESET_CONNECTION round trip on every
+        # checkout. The pipeline owns these connections, so anything that changes
+        # session state (autocommit, SET SESSION ...) must restore it before returning
+        # the connection; get_db_connection rolls back any transaction left open.
         try:
             pool = pooling.MySQLConnectionPool(
                 pool_name=f"pool_{brand_idx}",
                 pool_size=int(os.environ.get(f"DB_POOL_SIZE_{brand_idx}", "5")),
-                pool_reset_session=True,
+                pool_reset_session=False,
                 **db_config
             )
             db_connection_pools[brand_idx] = pool
@@ -559,7 +600,7 @@ def initialize_brand_configs():
                     pool = pooling.MySQLConnectionPool(
                         pool_name=f"pool_{brand_idx}",
                         pool_size=int(os.environ.get(f"DB_POOL_SIZE_{brand_idx}", "5")),
-                        pool_reset_session=True,
+                        pool_reset_session=False,
                         **db_config
                     )
                     db_connection_pools[brand_idx] = pool
@@ -576,7 +617,10 @@ def initialize_brand_configs():
         # --------------------------
         try:
             mysql_connect_str = f"mysql+mysqlconnector://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}?charset=utf8mb4"
-            connect_args = {"connection_timeout": int(os.environ.get("DB_CONNECT_TIMEOUT_S", "10"))}
+            connect_args = {
+                "connection_timeout": int(os.environ.get("DB_CONNECT_TIMEOUT_S", "10")),
+                "allow_local_infile": USE_LOAD_DATA_INFILE,
+            }
             if effective_ca_path:
                 connect_args.update({"ssl_ca": effective_ca_path, "ssl_verify_cert": verify_cert, "ssl_verify_identity": effective_verify_identity})
 
@@ -597,7 +641,11 @@ def initialize_brand_configs():
                 logger.warning(f"⚠️ Engine SSL failed for {brand_name}. Retrying WITHOUT SSL fallback...")
                 try:
                     engine = create_engine(
-                        mysql_connect_str, connect_args={"connection_timeout": int(os.environ.get("DB_CONNECT_TIMEOUT_S", "10"))},
+                        mysql_connect_str,
+                        connect_args={
+                            "connection_timeout": int(os.environ.get("DB_CONNECT_TIMEOUT_S", "10")),
+                            "allow_local_infile": USE_LOAD_DATA_INFILE,
+                        },
                         poolclass=QueuePool, pool_size=int(os.environ.get(f"SA_POOL_SIZE_{brand_idx}", "1")),
                         max_overflow=int(os.environ.get(f"SA_MAX_OVERFLOW_{brand_idx}", "0")),
                         pool_pre_ping=True, pool_recycle=int(os.environ.get("SA_POOL_RECYCLE_S", "1800")),
@@ -623,6 +671,7 @@ def initialize_brand_configs():
         os.environ[f"DB_DATABASE_{brand_idx}"] = db_name
         os.environ[f"SPEED_KEY_{brand_idx}"] = speed_key
         os.environ[f"APP_ID_MAPPING_{brand_idx}"] = app_map_str
+        load_brand_config(brand_idx)
 
         brand_id_from_config[brand_idx] = brand_idx  # store brand_id from pipelinecreds document
         active_brand_indices.append(brand_idx)
@@ -754,6 +803,12 @@ def get_db_connection(brand_index: int, attempts: int = 10, sleep_s: float = 0.2
     try:
         yield cnx
     finally:
+        try:
+            # Pools don't reset sessions, so never hand an open transaction to the next borrower
+            if cnx.in_transaction:
+                cnx.rollback()
+        except Exception:
+            pass
         try:
             cnx.close()  # returns to pool
         except Exception:
@@ -792,27 +847,139 @@ def update_last_fetch_timestamp(cursor, connection, new_timestamp):
     connection.commit()
 
 
+# ---------------------------
+# Shared async runtime (one loop + one aiohttp session for the whole process)
+# ---------------------------
+# Brands run on worker threads; their fetches are scheduled onto this loop so the
+# connection pool, DNS cache and TLS sessions survive across brands and cycles.
+_ASYNC_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_ASYNC_LOOP_THREAD: Optional[threading.Thread] = None
+_ASYNC_LOOP_LOCK = threading.Lock()
+_AIOHTTP_SESSION: Optional[aiohttp.ClientSession] = None
+# Upper bound on in-flight Shopify requests across all brands sharing the loop
+SHOPIFY_MAX_CONCURRENT_REQUESTS = int(os.environ.get("SHOPIFY_MAX_CONCURRENT_REQUESTS", str(CPU_COUNT * 2)))
+_SHOPIFY_SEMAPHORE: Optional[asyncio.Semaphore] = None
+
+
+def _get_async_loop() -> asyncio.AbstractEventLoop:
+    global _ASYNC_LOOP, _ASYNC_LOOP_THREAD
+    with _ASYNC_LOOP_LOCK:
+        if _ASYNC_LOOP is None or _ASYNC_LOOP.is_closed():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="shopify-async-loop", daemon=True)
+            thread.start()
+            _ASYNC_LOOP, _ASYNC_LOOP_THREAD = loop, thread
+        return _ASYNC_LOOP
+
+
+def run_async(coro):
+    """Run a coroutine on the shared loop from any thread and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_async_loop()).result()
+
+
+async def get_aiohttp_session() -> aiohttp.ClientSession:
+    # Only ever called from the shared loop, so no locking needed
+    global _AIOHTTP_SESSION
+    if _AIOHTTP_SESSION is None or _AIOHTTP_SESSION.closed:
+        _AIOHTTP_SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=50, limit_per_host=10, ttl_dns_cache=600, keepalive_timeout=75),
+            timeout=aiohttp.ClientTimeout(total=300),
+        )
+    return _AIOHTTP_SESSION
+
+
+def _get_shopify_semaphore() -> asyncio.Semaphore:
+    # Created lazily so it binds to the shared loop
+    global _SHOPIFY_SEMAPHORE
+    if _SHOPIFY_SEMAPHORE is None:
+        _SHOPIFY_SEMAPHORE = asyncio.Semaphore(max(1, SHOPIFY_MAX_CONCURRENT_REQUESTS))
+    return _SHOPIFY_SEMAPHORE
+
+
+async def _prewarm_async_runtime():
+    await get_aiohttp_session()
+    _get_shopify_semaphore()
+
+
+def prewarm_async_runtime():
+    """Start the shared loop and open its session/semaphore before the first cycle."""
+    try:
+        run_async(_prewarm_async_runtime())
+    except Exception as e:
+        logger.warning(f"⚠️ Async runtime prewarm failed (will initialize lazily): {e}")
+
+
+async def _close_aiohttp_session():
+    global _AIOHTTP_SESSION, _SHOPIFY_SEMAPHORE
+    if _AIOHTTP_SESSION is not None and not _AIOHTTP_SESSION.closed:
+        await _AIOHTTP_SESSION.close()
+    _AIOHTTP_SESSION = None
+    _SHOPIFY_SEMAPHORE = None
+
+
+def close_async_runtime():
+    """Close the shared aiohttp session and stop the background loop (shutdown only)."""
+    global _ASYNC_LOOP, _ASYNC_LOOP_THREAD
+    with _ASYNC_LOOP_LOCK:
+        loop, thread = _ASYNC_LOOP, _ASYNC_LOOP_THREAD
+        _ASYNC_LOOP, _ASYNC_LOOP_THREAD = None, None
+    if loop is None or loop.is_closed():
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(_close_aiohttp_session(), loop).result(timeout=10)
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to close aiohttp session cleanly: {e}")
+    loop.call_soon_threadsafe(loop.stop)
+    if thread is not None:
+        thread.join(timeout=10)
+    loop.close()
+
+
 # ---------------------------
 # Shopify orders fetching (async)
 # ---------------------------
-async def fetch_orders_async(api_base_url: str, access_token: str, start_date: str,
-                             end_date: str, date_filter_field: str) -> List[Dict]:
-    headers = {"X-Shopify-Access-Token": access_token}
+# Large windows (backfills, long outages) are split into sub-windows paged concurrently
+SHOPIFY_FETCH_MAX_SPLITS = int(os.environ.get("SHOPIFY_FETCH_MAX_SPLITS", "8"))
+SHOPIFY_FETCH_MIN_SPLIT_HOURS = float(os.environ.get("SHOPIFY_FETCH_MIN_SPLIT_HOURS", "6"))
+SHOPIFY_FETCH_WINDOW_CONCURRENCY = int(os.environ.get("SHOPIFY_FETCH_WINDOW_CONCURRENCY", "4"))
+
+
+def _split_fetch_window(start_date: str, end_date: str) -> List[Tuple[str, str]]:
+    """Split a convert_to_desired_format window into contiguous sub-windows."""
+    try:
+        start_dt = datetime.fromisoformat(start_date[:19])
+        end_dt = datetime.fromisoformat(end_date[:19])
+    except ValueError:
+        return [(start_date, end_date)]
+
+    span_s = (end_dt - start_dt).total_seconds()
+    min_split_s = SHOPIFY_FETCH_MIN_SPLIT_HOURS * 3600
+    n = min(SHOPIFY_FETCH_MAX_SPLITS, int(span_s // min_split_s)) if min_split_s > 0 else SHOPIFY_FETCH_MAX_SPLITS
+    if n <= 1:
+        return [(start_date, end_date)]
+
+    step_s = int(span_s // n)
+    windows = []
+    for i in range(n):
+        w_start = start_dt + timedelta(seconds=i * step_s)
+        # Boundaries are shared (filters are inclusive and timestamps carry sub-second
+        # precision); the caller drops the duplicates this can produce
+        w_end = end_dt if i == n - 1 else start_dt + timedelta(seconds=(i + 1) * step_s)
+        windows.append((convert_to_desired_format(w_start), convert_to_desired_format(w_end)))
+    return windows
+
+
+async def _fetch_orders_window(session: aiohttp.ClientSession, api_base_url: str, headers: Dict[str, str],
+                               start_date: str, end_date: str, date_filter_field: str) -> List[Dict]:
     order_list: List[Dict] = []
 
-    # Ensure refunds/cancel snapshots are present
+    # Ensure refunds/cancel snapshots are present.
+    # Shopify's `fields` filter only applies to top-level properties; nested objects
+    # (refunds, line_items, customer, note_attributes) always come back whole.
     fields = (
         "id,name,created_at,updated_at,cancelled_at,total_price,financial_status,"
         "payment_gateway_names,app_id,currency,discount_codes,discount_applications,landing_site,"
-        "refunds,refunds/created_at,refunds/transactions,"
-        "refunds/transactions/amount,refunds/transactions/kind,refunds/transactions/status,"
-        "line_items,line_items/sku,line_items/title,line_items/variant_title,"
-        "line_items/price,line_items/quantity,line_items/total_discount,"
-        "line_items/product_id,line_items/variant_id,line_items/properties,"
-        "line_items/properties/name,line_items/properties/value,"
-        "customer,customer/id,customer/email,customer/first_name,"
-        "customer/last_name,customer/phone,customer/tags,"
-        "note_attributes,note_attributes/name,note_attributes/value"
+        "refunds,line_items,customer,note_attributes"
     )
 
     date_filter_field_max = date_filter_field.replace('_min', '_max')
@@ -822,95 +989,212 @@ async def fetch_orders_async(api_base_url: str, access_token: str, start_date: s
         f"&fields={fields}"
     )
 
-    connector = aiohttp.TCPConnector(limit=10, limit_per_host=5)
-    timeout = aiohttp.ClientTimeout(total=300)
+    semaphore = _get_shopify_semaphore()
 
-    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-        while url:
-            try:
+    while url:
+        try:
+            # Hold a slot only for the request itself; back-off sleeps don't block other brands
+            async with semaphore:
                 async with session.get(url, headers=headers) as response:
                     if response.status == 429:
                         retry_after = int(response.headers.get('Retry-After', 2))
-                        logger.warning(f"Rate limited, waiting {retry_after}s")
-                        await asyncio.sleep(retry_after)
-                        continue
-
-                    if response.status != 200:
+                        data = None
+                    elif response.status != 200:
                         logger.error(f"Failed to fetch data: {response.status}")
                         break
+                    else:
+                        data = _json_loads(await response.read())
+                        link_header = response.headers.get('Link', '')
+
+            if data is None:
+                logger.warning(f"Rate limited, waiting {retry_after}s")
+                await asyncio.sleep(retry_after)
+                continue
+
+            orders = data.get('orders', [])
+            if not orders:
+                break
+
+            order_list.extend(orders)
 
-                    data = await response.json()
-                    orders = data.get('orders', [])
-                    if not orders:
+            # parse Link header for next
+            url = None
+            if 'rel="next"' in link_header:
+                for part in link_header.split(','):
+                    if 'rel="next"' in part:
+                        url = part.split(';')[0].strip('<> ')
                         break
 
-                    order_list.extend(orders)
+            await asyncio.sleep(0.5)
+        except Exception as e:
+            logger.error(f"Error fetching orders: {e}")
+            break
+
+    return order_list
 
-                    # parse Link header for next
-                    link_header = response.headers.get('Link', '')
-                    url = None
-                    if 'rel="next"' in link_header:
-                        for part in link_header.split(','):
-                            if 'rel="next"' in part:
-                                url = part.split(';')[0].strip('<> ')
-                                break
 
-                    await asyncio.sleep(0.5)
-            except Exception as e:
-                logger.error(f"Error fetching orders: {e}")
-                break
+async def fetch_orders_async(api_base_url: str, access_token: str, start_date: str,
+                             end_date: str, date_filter_field: str,
+                             session: Optional[aiohttp.ClientSession] = None) -> List[Dict]:
+    headers = {"X-Shopify-Access-Token": access_token, "Accept-Encoding": "gzip, deflate"}
+    if session is None:
+        session = await get_aiohttp_session()
+
+    windows = _split_fetch_window(start_date, end_date)
+    if len(windows) == 1:
+        return await _fetch_orders_window(session, api_base_url, headers, start_date, end_date, date_filter_field)
 
+    logger.info(f"🔀 Fetching {date_filter_field} window as {len(windows)} concurrent sub-windows")
+    window_slots = asyncio.Semaphore(max(1, SHOPIFY_FETCH_WINDOW_CONCURRENCY))
+
+    async def _bounded(w_start: str, w_end: str) -> List[Dict]:
+        async with window_slots:
+            return await _fetch_orders_window(session, api_base_url, headers, w_start, w_end, date_filter_field)
+
+    results = await asyncio.gather(*(_bounded(w_start, w_end) for w_start, w_end in windows))
+
+    # Shared boundaries, and orders edited mid-fetch moving between sub-windows, can repeat an id
+    seen: Set[Any] = set()
+    order_list: List[Dict] = []
+    for o in itertools.chain.from_iterable(results):
+        oid = o.get('id')
+        if oid in seen:
+            continue
+        seen.add(oid)
+        order_list.append(o)
     return order_list
 
 def fetch_orders(api_base_url: str, access_token: str, start_date: str,
                  end_date: str, date_filter_field: str) -> List[Dict]:
     with timed(f"Shopify fetch ({date_filter_field} window)"):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(
-                fetch_orders_async(api_base_url, access_token, start_date, end_date, date_filter_field)
-            )
-        finally:
-            loop.close()
+        return run_async(
+            fetch_orders_async(api_base_url, access_token, start_date, end_date, date_filter_field)
+        )
 
 
 # ---------------------------
 # Transform (optimized; logic preserved)
 # ---------------------------
 def convert_to_desired_format(dt_obj: datetime) -> str:
-    iso_str = dt_obj.strftime('%Y-%m-%dT%H:%M:%S%z')
-    return f"{iso_str[:19]}%2B05:30"
+    # Same bytes as strftime('%Y-%m-%dT%H:%M:%S')[:19] + IST offset, without strftime
+    return (
+        f"{dt_obj.year:04d}-{dt_obj.month:02d}-{dt_obj.day:02d}"
+        f"T{dt_obj.hour:02d}:{dt_obj.minute:02d}:{dt_obj.second:02d}%2B05:30"
+    )
 
 
 def convert_to_desired_format_session(dt_obj: datetime) -> str:
-    iso_str = dt_obj.strftime('%Y-%m-%dT%H:%M:%S%z')
-    return f"{iso_str[:19]}%2B05:30"
-
-def extract_date_time(datetime_str: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
-    if not datetime_str:
-        return None, None
-    date, time_part = datetime_str.split('T')
-    time_s = time_part.split('+')[0]
-    return date, time_s
-
-def format_datetime(datetime_str: Optional[str]) -> Optional[str]:
-    if not datetime_str:
-        return None
-    return datetime_str.replace('Z', '+00:00') and datetime.fromisoformat(
-        datetime_str.replace('Z', '+00:00')
-    ).strftime('%Y-%m-%d %H:%M:%S')
+    return convert_to_desired_format(dt_obj)
+
+# Python 3.11+ fromisoformat parses a trailing 'Z' itself; older versions need it rewritten
+_HAS_311_ISO = sys.version_info >= (3, 11)
+
+if _HAS_311_ISO:
+    _fromisoformat = datetime.fromisoformat
+else:
+    def _fromisoformat(iso_ts: str) -> datetime:
+        return datetime.fromisoformat(iso_ts.replace('Z', '+00:00'))
+
+
+# Columns the transform loop leaves as raw Shopify values; converted column-wise
+# in _finalize_order_frame. Falsy raw values (None, '' and a numeric 0) become NULL,
+# same as the old per-row `float(x) if x else None`; the string '0.00' stays 0.0.
+_ORDER_NUMERIC_COLUMNS = (
+    'total_price', 'total_tax', 'total_discounts', 'total_duties',
+    'line_item_price', 'line_item_total_discount',
+)
+_ORDER_ZERO_AS_NULL_COLUMNS = ('shipping_price', 'line_item_quantity')
+
+
+def _non_empty(series: pd.Series) -> pd.Series:
+    return series.where(series.notna() & series.ne(''))
+
+
+def _finalize_order_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Column-wise date/time splitting and numeric conversion for the transform: each
+    conversion runs once per column instead of once per cell.
+    Timestamps keep Shopify's wall-clock value (the offset is dropped, not applied).
+    """
+    created_raw = _non_empty(df.pop('_created_at_raw'))
+    df['created_date'] = created_raw.str.slice(0, 10)
+    df['created_time'] = created_raw.str.slice(11).str.split('+', n=1).str[0]
+
+    updated_raw = _non_empty(df['updated_at'])
+    df['updated_date'] = updated_raw.str.slice(0, 10)
+    df['updated_time'] = updated_raw.str.slice(11).str.split('+', n=1).str[0]
+
+    for col in ('created_at', 'updated_at'):
+        raw = _non_empty(df[col])
+        df[col] = raw.str.slice(0, 10) + ' ' + raw.str.slice(11, 19)
+
+    for col in _ORDER_NUMERIC_COLUMNS:
+        raw = df[col]
+        df[col] = pd.to_numeric(raw, errors='coerce').where(raw.ne('') & ~raw.isin([0]))
+    for col in _ORDER_ZERO_AS_NULL_COLUMNS:
+        values = pd.to_numeric(df[col], errors='coerce')
+        df[col] = values.where(values != 0)
+
+    return df
+
+_EMPTY_ITEM_PROPS = {key: None for n in range(1, 10 + 1) for key in (f'_ITEM{n}_name', f'_ITEM{n}_value')}
+
+# Order columns repeated on every line-item row; the rest are only on an order's first row
+_LINE_ROW_CARRIED = frozenset({
+    '_created_at_raw', 'order_name', 'order_id', 'customer_id', 'tags', 'customer_tag',
+    'appmaker_platform', 'app_version', 'payment_gateway_names', 'full_url', 'user_agent',
+})
+
+
+def _assemble_order_frame(order_rows: List[Dict], item_rows: List[Dict], row_order_pos: List[int],
+                          row_item_pos: List[int], row_is_first: List[bool],
+                          note_overrides: Dict[str, Dict[int, Any]]) -> pd.DataFrame:
+    """
+    Build the one-row-per-line-item frame column-wise: order columns are broadcast with
+    take(), line-item columns are aligned by position, then note_attributes overrides
+    are applied per column.
+    """
+    order_pos = np.asarray(row_order_pos, dtype=np.int64)
+    orders = pd.DataFrame(order_rows)
+
+    # -1 is not in the index, so reindex leaves continuation rows empty
+    df = orders.reindex(np.where(np.asarray(row_is_first, dtype=bool), order_pos, -1))
+    carried = [c for c in orders.columns if c in _LINE_ROW_CARRIED]
+    df[carried] = orders[carried].to_numpy()[order_pos]
+    df = df.reset_index(drop=True)
+
+    if item_rows:
+        items = pd.DataFrame(item_rows).reindex(np.asarray(row_item_pos, dtype=np.int64))
+        items.index = df.index
+        overlap = [c for c in items.columns if c in df.columns]
+        df[overlap] = items[overlap]
+        df = pd.concat([df, items.drop(columns=overlap)], axis=1)
+
+    df = _finalize_order_frame(df)
+
+    for name, by_order in note_overrides.items():
+        hit = np.isin(order_pos, np.fromiter(by_order.keys(), dtype=np.int64))
+        # Note values are raw strings; widen converted columns to object as the per-row dicts did
+        if df[name].dtype != object:
+            df[name] = df[name].astype(object)
+        df.loc[hit, name] = pd.Series([by_order[p] for p in order_pos[hit]], index=df.index[hit], dtype=object)
+
+    return df
 
-@lru_cache(maxsize=10000)
-def cached_format_datetime(datetime_str):
-    return format_datetime(datetime_str)
 
 def transform_orders_to_df_optimized(orders_list: List[Dict], app_mapping: Dict) -> pd.DataFrame:
     with timed("Transform orders → DataFrame (optimized)"):
         if not orders_list:
             return pd.DataFrame()
 
-        order_data = []
+        # Order-level and line-item-level columns are collected separately and
+        # expanded to one row per line item in _assemble_order_frame.
+        order_rows: List[Dict] = []
+        item_rows: List[Dict] = []
+        row_order_pos: List[int] = []
+        row_item_pos: List[int] = []
+        row_is_first: List[bool] = []
+        note_overrides: Dict[str, Dict[int, Any]] = {}
         for order in orders_list:
             customer = order.get('customer') or {}
             shipping_address = order.get('shipping_address') or {}
@@ -933,8 +1217,6 @@ def transform_orders_to_df_optimized(orders_list: List[Dict], app_mapping: Dict)
 
             created_at_str = order.get('created_at', '')
             updated_at_str = order.get('updated_at', '')
-            created_date, created_time = extract_date_time(created_at_str)
-            updated_date, updated_time = extract_date_time(updated_at_str)
 
             # --- UTM Parsing (Updated) ---
             # 1. Try landing_site first (most reliable for Shopify)
@@ -983,10 +1265,11 @@ def transform_orders_to_df_optimized(orders_list: List[Dict], app_mapping: Dict)
                     if name in utm_data and not utm_data[name]:
                          utm_data[name] = val
 
+            # Timestamps and numerics stay raw here; _finalize_order_frame converts them per column.
             base = {
-                "created_at": format_datetime(created_at_str),
-                "created_date": created_date,
-                "created_time": created_time,
+                "created_at": created_at_str,
+                "created_date": None,
+                "created_time": None,
                 "order_id": str(order.get('id')) if order.get('id') else None,
                 "order_name": order.get('name'),
                 "customer_id": str(customer.get('id')) if customer.get('id') else None,
@@ -1005,18 +1288,18 @@ def transform_orders_to_df_optimized(orders_list: List[Dict], app_mapping: Dict)
                 "discount_application_ids": discount_app_ids,
                 "order_app_id": str(order_app_id) if order_app_id else None,
                 "order_app_name": order_app_name,
-                "total_price": float(order.get('total_price', 0)) if order.get('total_price') else None,
-                "shipping_price": float(order.get('total_shipping_price_set', {}).get('shop_money', {}).get('amount', '0')) or None,
-                "total_tax": float(order.get('current_total_tax', 0)) if order.get('current_total_tax') else None,
+                "total_price": order.get('total_price'),
+                "shipping_price": ((order.get('total_shipping_price_set') or {}).get('shop_money') or {}).get('amount'),
+                "total_tax": order.get('current_total_tax'),
                 "payment_gateway_names": payment_gateway_names,
-                "total_discounts": float(order.get('total_discounts', 0)) if order.get('total_discounts') else None,
-                "total_duties": float(order.get('total_duties', 0)) if order.get('total_duties') else None,
+                "total_discounts": order.get('total_discounts'),
+                "total_duties": order.get('total_duties'),
                 "sku": None, "variant_title": None, "line_item": None, "line_item_price": None,
                 "line_item_quantity": None, "line_item_total_discount": None, "product_id": None, "variant_id": None,
                 "tags": order.get('tags') or None,
-                "updated_at": format_datetime(updated_at_str),
-                "updated_date": updated_date,
-                "updated_time": updated_time,
+                "updated_at": updated_at_str,
+                "updated_date": None,
+                "updated_time": None,
                 "orig_referrer": order.get('orig_referrer'),
                 "full_url": order.get('full_url'),
                 "customer_ip": order.get('customer_ip'),
@@ -1036,6 +1319,7 @@ def transform_orders_to_df_optimized(orders_list: List[Dict], app_mapping: Dict)
                 "app_version": order.get('app_version'),
                 # Add user_agent to base dictionary, defaulting to "unknown"
                 "user_agent": "unknown",
+                "_created_at_raw": created_at_str,
             }
 
             # Extract user_agent from note_attributes if present
@@ -1051,94 +1335,132 @@ def transform_orders_to_df_optimized(orders_list: List[Dict], app_mapping: Dict)
             else:
                  logger.debug(f"no user_agent found for order {base['order_name']}, setting to unknown")
 
+            order_pos = len(order_rows)
+            order_rows.append(base)
+
             line_items = order.get('line_items', [])
             if not line_items:
-                order_data.append(base)
-                continue
+                row_order_pos.append(order_pos)
+                row_item_pos.append(-1)
+                row_is_first.append(True)
+                item_row = None
+            else:
+                item_row = None
+                for i, item in enumerate(line_items):
+                    if item is None:
+                        continue
 
-            for i, item in enumerate(line_items):
-                if item is None:
-                    continue
+                    allocs = item.get("discount_allocations") or []
+                    discount_amount_per_line_item = 0.0
+                    for a in allocs:
+                        try:
+                            discount_amount_per_line_item += float(a.get("amount") or 0.0)
+                        except Exception:
+                            pass
 
-                row = base.copy() if i == 0 else {k: None for k in base.keys()}
+                    # if you prefer NULL instead of 0 when no allocations:
+                    discount_amount_per_line_item = (
+                        discount_amount_per_line_item if discount_amount_per_line_item > 0 else None
+                    )
 
-                allocs = item.get("discount_allocations") or []
-                discount_amount_per_line_item = 0.0
-                for a in allocs:
-                    try:
-                        discount_amount_per_line_item += float(a.get("amount") or 0.0)
-                    except Exception:
-                        pass
-                
-                # if you prefer NULL instead of 0 when no allocations:
-                discount_amount_per_line_item = (
-                    discount_amount_per_line_item if discount_amount_per_line_item > 0 else None
-                )
-                if i > 0:
-                    row.update({
-                        "created_date": created_date,
-                        "created_time": created_time,
-                        "order_name": order.get('name'),
-                        "order_id": str(order.get('id')) if order.get('id') else None,
-                        "customer_id": str(customer.get('id')) if customer.get('id') else None,
-                        "tags": order.get('tags') or None,
-                        "customer_tag": customer.get('tags'),
-                        "appmaker_platform": order.get('appmaker_platform'),
-                        "app_version": order.get('app_version'),
-                        "payment_gateway_names": payment_gateway_names,
-                        "discount_amount_per_line_item": discount_amount_per_line_item,
-                        "full_url": order.get('full_url'),
-                        # Add UTMs for subsequent lines explicitly (though they are in base, good to be safe if base is not copied fully for props)
+                    item_row = {
+                        "sku": item.get('sku'),
+                        "variant_title": item.get('variant_title'),
+                        "line_item": item.get('title'),
                         "utm_source": utm_data['utm_source'],
                         "utm_medium": utm_data['utm_medium'],
                         "utm_campaign": utm_data['utm_campaign'],
                         "utm_content": utm_data['utm_content'],
                         "utm_term": utm_data['utm_term'],
-                        "user_agent": base.get("user_agent"),
-                    })
-
-                row.update({
-                    "sku": item.get('sku'),
-                    "variant_title": item.get('variant_title'),
-                    "line_item": item.get('title'),
-                    "order_id": str(order.get('id')) if order.get('id') else None,
-                    "full_url": order.get('full_url'),
-                    "utm_source": utm_data['utm_source'],
-                    "utm_medium": utm_data['utm_medium'],
-                    "utm_campaign": utm_data['utm_campaign'],
-                    "utm_content": utm_data['utm_content'],
-                    "utm_term": utm_data['utm_term'],
-                    "line_item_price": float(item.get('price', 0)) if item.get('price') else None,
-                    "line_item_quantity": int(item.get('quantity', 0)) if item.get('quantity') else None,
-                    "line_item_total_discount": float(item.get('total_discount', 0)) if item.get('total_discount') else None,
-                    "discount_amount_per_line_item": discount_amount_per_line_item,
-                    "product_id": str(item.get('product_id')) if item.get('product_id') else None,
-                    "variant_id": str(item.get('variant_id')) if item.get('variant_id') else None,
-                    "user_agent": base.get("user_agent"),
-                })
-
-                props = item.get('properties', []) or []
-                for n in range(1, 10 + 1):
-                    row.setdefault(f'_ITEM{n}_name', None)
-                    row.setdefault(f'_ITEM{n}_value', None)
-                for idx, prop in enumerate(props[:10]):
-                    if prop and prop.get('name', '').startswith('_ITEM'):
-                        value = (prop.get('value') or '').strip()
-                        value_parts = value.split("SKU:")
-                        row[f'_ITEM{idx + 1}_name'] = value_parts[0].strip() if len(value_parts) > 0 else None
-                        row[f'_ITEM{idx + 1}_value'] = value_parts[1].strip() if len(value_parts) > 1 else None
+                        "line_item_price": item.get('price'),
+                        "line_item_quantity": item.get('quantity'),
+                        "line_item_total_discount": item.get('total_discount'),
+                        "discount_amount_per_line_item": discount_amount_per_line_item,
+                        "product_id": str(item.get('product_id')) if item.get('product_id') else None,
+                        "variant_id": str(item.get('variant_id')) if item.get('variant_id') else None,
+                    }
 
+                    props = item.get('properties', []) or []
+                    item_row.update(_EMPTY_ITEM_PROPS)
+                    for idx, prop in enumerate(props[:10]):
+                        if prop and prop.get('name', '').startswith('_ITEM'):
+                            value = (prop.get('value') or '').strip()
+                            value_parts = value.split("SKU:")
+                            item_row[f'_ITEM{idx + 1}_name'] = value_parts[0].strip() if len(value_parts) > 0 else None
+                            item_row[f'_ITEM{idx + 1}_value'] = value_parts[1].strip() if len(value_parts) > 1 else None
+
+                    row_order_pos.append(order_pos)
+                    row_item_pos.append(len(item_rows))
+                    row_is_first.append(i == 0)
+                    item_rows.append(item_row)
+
+            # note_attributes override any column present on this order's line-item rows
+            # (last one wins); an order without line items keeps its own values
+            if item_row is not None:
                 for note in order.get('note_attributes', []) or []:
-                    if note and note.get('name') in row:
-                        row[note['name']] = note.get('value')
+                    if not note:
+                        continue
+                    name = note.get('name')
+                    if name != '_created_at_raw' and (name in base or name in item_row):
+                        note_overrides.setdefault(name, {})[order_pos] = note.get('value')
 
-                order_data.append(row)
+        if not row_order_pos:
+            return pd.DataFrame()
 
-        df = pd.DataFrame(order_data)
-        df = df.replace({np.nan: None, 'N/A': None, '': None})
+        df = _assemble_order_frame(order_rows, item_rows, row_order_pos, row_item_pos, row_is_first, note_overrides)
+        # Only object columns can hold 'N/A'/''; numeric columns keep NaN (written as NULL)
+        for col in df.select_dtypes(include='object').columns:
+            values = df[col]
+            df[col] = values.mask(values.isna() | values.isin(['N/A', '']), None)
         return df
 
 
+# Shard the transform across processes once a batch is big enough to pay for pickling
+TRANSFORM_PARALLEL_MIN_ORDERS = int(os.environ.get("TRANSFORM_PARALLEL_MIN_ORDERS", "5000"))
+_TRANSFORM_POOL: Optional[ProcessPoolExecutor] = None
+_TRANSFORM_POOL_LOCK = threading.Lock()
+
+
+def _get_transform_pool() -> ProcessPoolExecutor:
+    global _TRANSFORM_POOL
+    with _TRANSFORM_POOL_LOCK:
+        if _TRANSFORM_POOL is None:
+            # spawn: brands call this from worker threads, and forking a threaded process is unsafe
+            _TRANSFORM_POOL = ProcessPoolExecutor(
+                max_workers=CPU_COUNT, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _TRANSFORM_POOL
+
+
+def shutdown_transform_pool():
+    global _TRANSFORM_POOL
+    with _TRANSFORM_POOL_LOCK:
+        pool, _TRANSFORM_POOL = _TRANSFORM_POOL, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def transform_orders(orders_list: List[Dict], app_mapping: Dict) -> pd.DataFrame:
+    """transform_orders_to_df_optimized, split across CPU cores for large batches."""
+    if CPU_COUNT < 2 or len(orders_list) < TRANSFORM_PARALLEL_MIN_ORDERS:
+        return transform_orders_to_df_optimized(orders_list, app_mapping)
+
+    shard_size = -(-len(orders_list) // CPU_COUNT)
+    shards = [orders_list[i:i + shard_size] for i in range(0, len(orders_list), shard_size)]
+    try:
+        with timed(f"Parallel transform of {len(orders_list)} orders ({len(shards)} shards)"):
+            frames = list(_get_transform_pool().map(
+                transform_orders_to_df_optimized, shards, itertools.repeat(app_mapping)
+            ))
+    except Exception as e:
+        logger.warning(f"⚠️ Parallel transform failed ({e}); transforming in-process")
+        shutdown_transform_pool()
+        return transform_orders_to_df_optimized(orders_list, app_mapping)
+
+    frames = [f for f in frames if not f.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
 # ---------------------------
 # Returns fact helpers
 # ---------------------------
@@ -1155,15 +1477,56 @@ def _ensure_returns_fact(cursor, connection):
     """)
     connection.commit()
 
+# Raw cancel/refund-transaction rows (no PK); aggregated into returns_fact in SQL.
+# TEMPORARY, so each session stages its own rows and clearing it is a DELETE inside the
+# merge transaction (TRUNCATE would commit and clear other writers' rows).
+_RETURNS_STAGE_DDL = """
+    CREATE TEMPORARY TABLE IF NOT EXISTS returns_fact_stage_tmp (
+      order_id     BIGINT        NOT NULL,
+      event_date   DATE          NOT NULL,
+      event_type   ENUM('CANCEL','REFUND') NOT NULL,
+      amount       DECIMAL(12,2) NOT NULL,
+      KEY idx_stage_key (order_id, event_type, event_date)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+# brand_index values whose shared returns_fact_stage table (from earlier versions) has been dropped
+_returns_stage_swept: Set[int] = set()
+
+
+def _drop_shared_returns_stage(cursor, brand_index: int):
+    if brand_index in _returns_stage_swept:
+        return
+    try:
+        cursor.execute("DROP TABLE IF EXISTS returns_fact_stage")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not drop old returns_fact_stage table: {e}")
+    _returns_stage_swept.add(brand_index)
+
+
 def _parse_iso_to_ist_date(iso_ts: Optional[str]) -> Optional[str]:
     if not iso_ts:
         return None
     try:
-        dt = datetime.fromisoformat(iso_ts.replace('Z', '+00:00'))
+        dt = _fromisoformat(iso_ts)
         return dt.astimezone(IST).date().isoformat()
     except Exception:
         return None
 
+
+def _iso_to_ist_dates(values: List[Optional[str]]) -> List[Optional[str]]:
+    """Vectorized _parse_iso_to_ist_date: one pandas pass over many timestamps (empty/unparseable -> None)."""
+    if not values:
+        return []
+    series = pd.Series(values, dtype=object)
+    try:
+        parsed = pd.to_datetime(series, utc=True, errors='coerce', format='ISO8601')
+    except (TypeError, ValueError):
+        # pandas < 2.0 has no format='ISO8601'
+        parsed = pd.to_datetime(series, utc=True, errors='coerce')
+    ist_dates = parsed.dt.tz_convert(IST).dt.strftime('%Y-%m-%d').astype(object)
+    return ist_dates.where(parsed.notna(), None).tolist()
+
 def upsert_returns_fact_from_orders(brand_index: int, orders_list: List[Dict], cursor=None, connection=None) -> Set[str]:
     """Idempotently upsert CANCEL and REFUND events per order per day.
 
@@ -1198,93 +1561,96 @@ def upsert_returns_fact_from_orders(brand_index: int, orders_list: List[Dict], c
                 _ensure_returns_fact(cursor, connection)
             else:
                 raise
+        _drop_shared_returns_stage(cursor, brand_index)
 
-        agg: Dict[Tuple[str, str, str], float] = {}
-
+        # Cancels: one row per cancelled order, dated in one vectorized pass
+        cancels: List[Tuple[int, float]] = []
+        cancel_ts: List[str] = []
         for o in orders_list:
-            oid = str(o.get('id')) if o.get('id') else None
-            if not oid:
-                continue
-
-            cancelled_at = o.get('cancelled_at')
-            if cancelled_at:
-                d = _parse_iso_to_ist_date(cancelled_at)
-                if d:
-                    amt = float(o.get('total_price') or 0.0)
-                    key = (oid, 'CANCEL', d)
-                    agg[key] = max(agg.get(key, 0.0), amt)
-
-            refunds = o.get('refunds') or []
-            for rf in refunds:
-                rdate = _parse_iso_to_ist_date(rf.get('created_at'))
-                if not rdate:
-                    continue
-                txns = rf.get('transactions') or []
-                refund_sum = 0.0
-                for t in txns:
-                    kind = (t.get('kind') or '').lower()
-                    if kind in ('refund', 'chargeback', 'return'):
-                        try:
-                            amt = float(t.get('amount') or 0.0)
-                            refund_sum += abs(amt)
-                        except Exception:
-                            continue
-                if refund_sum > 0:
-                    key = (oid, 'REFUND', rdate)
-                    agg[key] = agg.get(key, 0.0) + refund_sum
+            if o.get('id') and o.get('cancelled_at'):
+                cancels.append((int(o['id']), float(o.get('total_price') or 0.0)))
+                cancel_ts.append(o['cancelled_at'])
+
+        # One raw row per event: (order_id, event_date, event_type, amount)
+        rows = [(oid, d, 'CANCEL', amt) for (oid, amt), d in zip(cancels, _iso_to_ist_dates(cancel_ts)) if d]
+
+        # Refunds: flatten transactions once, then mask/convert/sum column-wise
+        refund_txns = [
+            (int(o['id']), rf.get('created_at'), t.get('kind'), t.get('amount'))
+            for o in orders_list if o.get('id')
+            for rf in (o.get('refunds') or []) if rf
+            for t in (rf.get('transactions') or []) if t
+        ]
+        if refund_txns:
+            txn_df = pd.DataFrame(refund_txns, columns=['order_id', 'created_at', 'kind', 'amount'])
+            txn_df = txn_df[txn_df['kind'].astype(str).str.lower().isin(['refund', 'chargeback', 'return'])]
+            txn_df = txn_df.assign(
+                amount=pd.to_numeric(txn_df['amount'], errors='coerce').abs(),
+                event_date=_iso_to_ist_dates(txn_df['created_at'].tolist()),
+            ).dropna(subset=['amount', 'event_date'])
+            refund_totals = txn_df.groupby(['order_id', 'event_date'], sort=False)['amount'].sum()
+            refund_totals = refund_totals[refund_totals > 0]
+            rows += [
+                (int(oid), d, 'REFUND', float(amt))
+                for (oid, d), amt in refund_totals.items()
+            ]
 
-        if not agg:
+        if not rows:
             return set()
 
-        # Compare against existing values first so callers can use only true deltas
-        # for affected range expansion.
-        changed_dates: Set[str] = set()
-        existing_amounts: Dict[Tuple[str, str, str], float] = {}
-        order_ids = sorted({int(k[0]) for k in agg.keys()})
+        # CANCEL keeps the largest snapshot amount, REFUND sums transactions;
+        # refund days that net to zero are not recorded.
+        aggregated_sql = """
+            SELECT order_id, event_date, event_type,
+                   CASE WHEN event_type = 'CANCEL' THEN MAX(amount) ELSE SUM(amount) END AS amount
+            FROM returns_fact_stage_tmp
+            GROUP BY order_id, event_date, event_type
+            HAVING event_type = 'CANCEL' OR SUM(amount) > 0
+        """
 
-        def _chunked(values: List[int], size: int = 500):
-            for i in range(0, len(values), size):
-                yield values[i:i + size]
+        def _stage_and_merge() -> Set[str]:
+            # Re-created after a reconnect; otherwise left over from this session's last call
+            cursor.execute(_RETURNS_STAGE_DDL)
+            cursor.execute("DELETE FROM returns_fact_stage_tmp")
+            # One multi-row statement per chunk instead of a round trip per row
+            for i in range(0, len(rows), 1000):
+                chunk = rows[i:i + 1000]
+                placeholders = ",".join(["(%s, %s, %s, %s)"] * len(chunk))
+                cursor.execute(
+                    f"""
+                    INSERT INTO returns_fact_stage_tmp (order_id, event_date, event_type, amount)
+                    VALUES {placeholders}
+                    """,
+                    list(itertools.chain.from_iterable(chunk)),
+                )
 
-        for chunk in _chunked(order_ids):
-            placeholders = ",".join(["%s"] * len(chunk))
-            cursor.execute(
-                f"""
-                SELECT order_id, event_type, event_date, amount
-                FROM returns_fact
-                WHERE order_id IN ({placeholders})
-                """,
-                tuple(chunk),
-            )
+            # Compare against existing values first so callers can use only true deltas
+            # for affected range expansion.
+            cursor.execute(f"""
+                SELECT DISTINCT a.event_date
+                FROM ({aggregated_sql}) AS a
+                LEFT JOIN returns_fact f
+                  ON f.order_id = a.order_id
+                 AND f.event_type = a.event_type
+                 AND f.event_date = a.event_date
+                WHERE f.order_id IS NULL OR ABS(f.amount - a.amount) > 0.009
+            """)
+            changed: Set[str] = set()
             for row in cursor.fetchall():
-                if isinstance(row, dict):
-                    r_order_id = str(row.get("order_id"))
-                    r_event_type = row.get("event_type")
-                    r_event_date = row.get("event_date")
-                    r_amount = float(row.get("amount") or 0.0)
-                else:
-                    r_order_id = str(row[0])
-                    r_event_type = row[1]
-                    r_event_date = row[2]
-                    r_amount = float(row[3] or 0.0)
-
-                r_event_date_str = r_event_date.isoformat() if hasattr(r_event_date, "isoformat") else str(r_event_date)
-                existing_amounts[(r_order_id, r_event_type, r_event_date_str)] = r_amount
-
-        for key, new_amount in agg.items():
-            old_amount = existing_amounts.get(key)
-            if old_amount is None or abs(float(old_amount) - float(new_amount)) > 0.009:
-                changed_dates.add(key[2])
-
-        rows = [(int(k[0]), k[2], k[1], round(v, 2)) for k, v in agg.items()]
-        insert_sql = """
-            INSERT INTO returns_fact (order_id, event_date, event_type, amount)
-            VALUES (%s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE amount = VALUES(amount);
-        """
-        try:
-            cursor.executemany(insert_sql, rows)
+                d = row.get("event_date") if isinstance(row, dict) else row[0]
+                changed.add(d.isoformat() if hasattr(d, "isoformat") else str(d))
+
+            cursor.execute(f"""
+                INSERT INTO returns_fact (order_id, event_date, event_type, amount)
+                SELECT * FROM ({aggregated_sql}) AS a
+                ON DUPLICATE KEY UPDATE amount = a.amount
+            """)
+            cursor.execute("DELETE FROM returns_fact_stage_tmp")
             connection.commit()
+            return changed
+
+        try:
+            changed_dates = _stage_and_merge()
         except mysql.connector.errors.OperationalError as e:
             if getattr(e, "errno", None) == 2013:
                 logger.warning("⚠️ Lost DB connection during returns_fact upsert; retrying once after reconnect")
@@ -1292,12 +1658,11 @@ def upsert_returns_fact_from_orders(brand_index: int, orders_list: List[Dict], c
                     connection.ping(reconnect=True, attempts=3, delay=2)
                 except Exception as ee:
                     logger.warning(f"⚠️ returns_fact reconnect retry failed: {ee}")
-                cursor.executemany(insert_sql, rows)
-                connection.commit()
+                changed_dates = _stage_and_merge()
             else:
                 raise
 
-        logger.info(f"✅ Upserted {len(rows)} rows into returns_fact ({len(changed_dates)} changed event dates)")
+        logger.info(f"✅ Upserted {len(rows)} staged events into returns_fact ({len(changed_dates)} changed event dates)")
         return changed_dates
 
     finally:
@@ -1311,33 +1676,26 @@ def upsert_returns_fact_from_orders(brand_index: int, orders_list: List[Dict], c
 # ---------------------------
 # Date range tracking
 # ---------------------------
-def get_affected_date_range_new_orders(orders_list: List[Dict]) -> Tuple[Optional[str], Optional[str]]:
+def get_affected_date_range_new_orders(df: pd.DataFrame) -> Set[str]:
     """
     For NEW orders (shopify_orders):
     - summaries depend only on created_date
-    - so we only look at created_at timestamps.
-    """
-    if not orders_list:
-        return None, None
-
-    dates: Set[str] = set()
-    for o in orders_list:
-        if o.get('created_at'):
-            d = _parse_iso_to_ist_date(o['created_at'])
-            if d:
-                dates.add(d)
+    - so we read the created_date column the transform already built.
 
-    if not dates:
-        return None, None
+    Returns the exact set of dates touched (not just min/max), so the
+    date-keyed summaries can refresh only those days.
+    """
+    if df.empty:
+        return set()
 
-    return min(dates), max(dates)
+    return set(df['created_date'].dropna().unique())
 
 
 
 def get_affected_date_range_updates(
     orders_list: List[Dict],
     extra_event_dates: Optional[Set[str]] = None,
-) -> Tuple[Optional[str], Optional[str]]:
+) -> Set[str]:
     # Developer validation scenarios:
     # A) Historical refund exists; order updated today for unrelated field:
     #    extra_event_dates stays empty, range includes only updated_at day (not old refund day).
@@ -1359,11 +1717,14 @@ def get_affected_date_range_updates(
       - financial_status NOT IN ('paid','pending')
       - OR cancelled_at is set
       - OR refunds list is non-empty
+
+    Returns the exact set of IST dates touched.
     """
     if not orders_list and not extra_event_dates:
-        return None, None
+        return set()
 
     dates: Set[str] = set(extra_event_dates or set())
+    updated: List[str] = []
     for o in orders_list:
         financial_status = (o.get('financial_status') or '').lower()
         refunds = o.get('refunds') or []
@@ -1379,54 +1740,43 @@ def get_affected_date_range_updates(
 
         # updated_at is the updated_date driver for summary refreshes.
         if o.get('updated_at'):
-            d = _parse_iso_to_ist_date(o['updated_at'])
-            if d:
-                dates.add(d)
+            updated.append(o['updated_at'])
 
-    if not dates:
-        return None, None
-
-    return min(dates), max(dates)
+    dates.update(d for d in _iso_to_ist_dates(updated) if d)
+    return dates
 
 
 # ---------------------------
 # DB reads/writes (accept cursor)
 # ---------------------------
-def get_orders_with_same_timestamp(brand_index: int, table_name: str, timestamp_value,
-                                   timestamp_field='created_at', cursor=None) -> set:
-    try:
-        if cursor is None:
-            with get_db_cursor(brand_index) as (c, _):
-                c.execute(f"SELECT order_id FROM {table_name} WHERE {timestamp_field} = %s", (timestamp_value,))
-                return {row['order_id'] for row in c.fetchall()}
-        else:
-            cursor.execute(f"SELECT order_id FROM {table_name} WHERE {timestamp_field} = %s", (timestamp_value,))
-            return {row['order_id'] for row in cursor.fetchall()}
-    except mysql.connector.Error as err:
-        logger.error(f"Error checking existing orders in {table_name}: {err}")
-        return set()
-
-def _get_last_order_with_cursor(cursor, table_name: str) -> Optional[Dict]:
+def _get_last_orders_with_cursor(cursor, table_name: str) -> List[Dict]:
+    """
+    Every row at the table's latest created_at/updated_at: the first is the resume point and
+    their order_ids are the ones the inclusive API window will return again (MySQL DATETIME
+    is second precision), so one query serves both.
+    """
     order_by_col = 'updated_at' if 'update' in table_name else 'created_at'
     cursor.execute(f"""
         SELECT order_id, created_at, updated_at
         FROM {table_name}
-        ORDER BY {order_by_col} DESC
-        LIMIT 1
+        WHERE {order_by_col} = (SELECT MAX({order_by_col}) FROM {table_name})
     """)
-    return cursor.fetchone()
+    return cursor.fetchall()
 
-def get_last_order(brand_index: int, table_name: str, cursor=None) -> Optional[Dict]:
+def get_last_orders(brand_index: int, table_name: str, cursor=None) -> List[Dict]:
     try:
         if cursor is None:
             with get_db_cursor(brand_index) as (c, _):
-                return _get_last_order_with_cursor(c, table_name)
+                return _get_last_orders_with_cursor(c, table_name)
         else:
-            return _get_last_order_with_cursor(cursor, table_name)
+            return _get_last_orders_with_cursor(cursor, table_name)
     except mysql.connector.Error as err:
-        logger.error(f"Error getting last order from {table_name}: {err}")
-        return None
+        logger.error(f"Error getting last orders from {table_name}: {err}")
+        return []
 
+def get_last_order(brand_index: int, table_name: str, cursor=None) -> Optional[Dict]:
+    rows = get_last_orders(brand_index, table_name, cursor=cursor)
+    return rows[0] if rows else None
 
 
 def ensure_user_agent_column(brand_index: int, table_name: str):
@@ -1457,6 +1807,137 @@ def ensure_user_agent_column(brand_index: int, table_name: str):
         logger.error(f"❌ Error in ensure_user_agent_column for {table_name}: {e}")
 
 
+# Bits of payment_flags: 1 = blank gateway (NULL/''), 2 = COD gateway, 4 = Gokwik PPCOD gateway
+PAYMENT_FLAGS_EXPR = (
+    "(CASE WHEN payment_gateway_names IS NULL OR payment_gateway_names = '' THEN 1 ELSE 0 END)"
+    " | (CASE WHEN payment_gateway_names LIKE '%Cash on Delivery (COD)%'"
+    " OR payment_gateway_names LIKE '%cash_on_delivery%' THEN 2 ELSE 0 END)"
+    " | (CASE WHEN payment_gateway_names LIKE '%Gokwik PPCOD%' THEN 4 ELSE 0 END)"
+)
+
+# Stored generated columns on the orders tables that the summary queries filter/group on:
+# name -> (SQLAlchemy type, MySQL type, expression, indexed)
+SUMMARY_KEY_COLUMNS = {
+    'created_date_d': (Date, "DATE", "CAST(NULLIF(created_date, '') AS DATE)", True),
+    'updated_date_d': (Date, "DATE", "CAST(NULLIF(updated_date, '') AS DATE)", True),
+    'payment_flags': (TINYINT(unsigned=True), "TINYINT UNSIGNED", PAYMENT_FLAGS_EXPR, False),
+}
+
+
+# (brand_index, table_name) pairs whose summary key columns are known to be present
+_summary_key_columns_ready: Set[Tuple[int, str]] = set()
+
+
+def ensure_summary_key_columns(brand_index: int, table_name: str) -> bool:
+    """
+    Ensure the generated summary key columns exist: indexed created_date_d / updated_date_d,
+    so summaries filter and group on a native DATE instead of calling STR_TO_DATE on every row,
+    and payment_flags, so payment buckets are bit tests instead of substring LIKEs per row.
+    Missing columns are added in one ALTER (a one-off rebuild). Returns False when they could
+    not be added (e.g. strict mode rejecting a malformed date); every summary query reads them.
+    """
+    key = (brand_index, table_name)
+    if key in _summary_key_columns_ready:
+        return True
+    engine = sqlalchemy_engines.get(brand_index)
+    if not engine:
+        return False
+
+    try:
+        with engine.connect() as conn:
+            existing = {
+                row[0] for row in conn.execute(text(
+                    "SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t"
+                ), {"t": table_name})
+            }
+            if not existing:
+                # Not created yet; _ensure_order_table creates it with these columns
+                return True
+            missing = [col for col in SUMMARY_KEY_COLUMNS if col not in existing]
+            if missing:
+                clauses = []
+                for col in missing:
+                    _, sql_type, expr, indexed = SUMMARY_KEY_COLUMNS[col]
+                    clauses.append(f"ADD COLUMN {col} {sql_type} AS ({expr}) STORED")
+                    if indexed:
+                        clauses.append(f"ADD INDEX idx_{col} ({col})")
+                logger.info(f"🔍 Adding {', '.join(missing)} to {table_name}...")
+                with timed(f"Add summary key columns to {table_name}"):
+                    conn.execute(text(f"ALTER TABLE {table_name} {', '.join(clauses)}"))
+                    conn.commit()
+                logger.info(f"✅ Successfully added {', '.join(missing)} to {table_name}")
+    except Exception as e:
+        logger.error(f"❌ Could not add summary key columns to {table_name}: {e}")
+        return False
+    _summary_key_columns_ready.add(key)
+    return True
+
+
+_ORDER_PARTITION_KEYS = {"shopify_orders": "created_date_d", "shopify_orders_update": "updated_date_d"}
+
+
+def _next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _month_partition(month_start) -> str:
+    return (f"PARTITION p{month_start:%Y%m} "
+            f"VALUES LESS THAN (TO_DAYS('{_next_month(month_start):%Y-%m-%d}'))")
+
+
+def ensure_order_table_partitions(brand_index: int, table_name: str):
+    """
+    With PARTITION_ORDER_TABLES on, keep shopify_orders / shopify_orders_update RANGE-partitioned
+    by month on their summary date key, so the summaries' date-window scans prune to the
+    partitions they touch. The first run partitions the existing table (a one-off rebuild);
+    later runs split this and next month's partitions off pmax when they are missing.
+    """
+    if not PARTITION_ORDER_TABLES:
+        return
+    engine = sqlalchemy_engines.get(brand_index)
+    if not engine:
+        return
+
+    key = _ORDER_PARTITION_KEYS[table_name]
+    this_month = datetime.now(IST).date().replace(day=1)
+    wanted = [this_month, _next_month(this_month)]
+    try:
+        with engine.connect() as conn:
+            existing = {
+                row[0] for row in conn.execute(text(
+                    "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND PARTITION_NAME IS NOT NULL"
+                ), {"t": table_name})
+            }
+            if not existing:
+                first = conn.execute(text(f"SELECT MIN({key}) FROM {table_name}")).scalar() or this_month
+                month, parts = first.replace(day=1), []
+                while month <= wanted[-1]:
+                    parts.append(_month_partition(month))
+                    month = _next_month(month)
+                parts.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+                with timed(f"Partition {table_name} by month on {key} ({len(parts)} partitions)"):
+                    conn.execute(text(
+                        f"ALTER TABLE {table_name} PARTITION BY RANGE (TO_DAYS({key})) ({', '.join(parts)})"
+                    ))
+                    conn.commit()
+                logger.info(f"✅ Partitioned {table_name} by month on {key}")
+                return
+
+            for month in wanted:
+                if f"p{month:%Y%m}" in existing:
+                    continue
+                conn.execute(text(
+                    f"ALTER TABLE {table_name} REORGANIZE PARTITION pmax INTO "
+                    f"({_month_partition(month)}, PARTITION pmax VALUES LESS THAN MAXVALUE)"
+                ))
+                conn.commit()
+                logger.info(f"✅ Added partition p{month:%Y%m} to {table_name}")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not maintain partitions on {table_name}: {e}")
+
+
 def ensure_device_summary_columns(brand_index: int, table_name: str):
     """
     Ensure device-wise session and ATC columns exist in the specific table.
@@ -1513,17 +1994,90 @@ def ensure_utm_names_column(brand_index: int, table_name: str = 'overall_utm_sum
         logger.error(f"❌ Error in ensure_utm_names_column for {table_name}: {e}")
 
 
-def load_data_to_sql_optimized(df: pd.DataFrame, brand_index: int, brand_name: str, table_name: str, batch_size: int = 1000):
-    if df.empty:
-        logger.info(f"DataFrame empty for {table_name}; nothing to load.")
-        return
+_TSV_SPECIAL_CHARS = re.compile(r'[\\\t\n\r]')
 
-    engine = sqlalchemy_engines.get(brand_index)
-    if not engine:
-        logger.error(f"No SQLAlchemy engine for brand {brand_index}")
-        return
 
-    metadata = MetaData()
+def _mysql_tsv_field(series: pd.Series, as_int: bool = False) -> pd.Series:
+    """Render one column in LOAD DATA's default text format (tab-separated, backslash-escaped, \\N = NULL)."""
+    if as_int:
+        series = pd.to_numeric(series, errors='coerce').astype('Int64')
+    nulls = series.isna()
+    out = series.astype(str)
+    # Numbers never need escaping; text columns only pay for the replaces when one needs them
+    if not pd.api.types.is_numeric_dtype(series.dtype) and out.str.contains(_TSV_SPECIAL_CHARS).any():
+        out = (
+            out.str.replace('\\', '\\\\', regex=False)
+            .str.replace('\t', '\\t', regex=False)
+            .str.replace('\n', '\\n', regex=False)
+            .str.replace('\r', '\\r', regex=False)
+        )
+    return out.mask(nulls, '\\N')
+
+
+def _load_df_via_local_infile(engine, df: pd.DataFrame, table_name: str, int_columns: Set[str]) -> None:
+    """
+    Stream df into table_name with LOAD DATA LOCAL INFILE.
+    mysql-connector only reads local files by path, so the rows go through a temp file.
+    LOCAL turns data errors (truncation, bad numbers/dates) into warnings, so any warning
+    rolls the load back and raises; the caller then retries through to_sql.
+    """
+    import tempfile
+
+    fields = [_mysql_tsv_field(df[c], as_int=c in int_columns) for c in df.columns]
+    lines = fields[0].str.cat(fields[1:], sep='\t') if len(fields) > 1 else fields[0]
+    column_list = ", ".join(f"`{c}`" for c in df.columns)
+
+    fd, path = tempfile.mkstemp(prefix=f"{table_name}_", suffix=".tsv")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write("\n".join(lines.tolist()))
+            f.write("\n")
+
+        raw = engine.raw_connection()
+        try:
+            cur = raw.cursor()
+            try:
+                if BULK_LOAD_RELAX_CHECKS:
+                    cur.execute(_BULK_LOAD_RELAX_SQL)
+                cur.execute(
+                    f"""
+                    LOAD DATA LOCAL INFILE %s
+                    INTO TABLE `{table_name}`
+                    CHARACTER SET utf8mb4
+                    FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+                    LINES TERMINATED BY '\\n'
+                    ({column_list})
+                    """,
+                    (path,),
+                )
+                warnings = getattr(cur, "warning_count", 0) or 0
+                if warnings:
+                    cur.execute("SHOW WARNINGS LIMIT 5")
+                    details = "; ".join(f"{r[1]}: {r[2]}" for r in cur.fetchall())
+                    raise RuntimeError(f"LOAD DATA reported {warnings} warnings ({details})")
+                raw.commit()
+            except Exception:
+                raw.rollback()
+                raise
+            finally:
+                # Pooled connections keep session state; never hand one back with checks off
+                if BULK_LOAD_RELAX_CHECKS:
+                    try:
+                        cur.execute(_BULK_LOAD_RESTORE_SQL)
+                    except Exception:
+                        pass
+                cur.close()
+        finally:
+            raw.close()
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _order_table_columns() -> List[Any]:
+    """Fresh Column objects for shopify_orders / shopify_orders_update (a Column binds to one Table)."""
     columns = [
         Column('created_at', DateTime), Column('created_date', String(10)), Column('created_time', String(8)),
         Column('order_id', String(50)), Column('order_name', String(50)), Column('customer_id', String(50)),
@@ -1553,38 +2107,107 @@ def load_data_to_sql_optimized(df: pd.DataFrame, brand_index: int, brand_name: s
         Column('utm_term', Text),
         Column('user_agent', Text),
     ]
-    for n in range(1, 11):
-        columns.append(Column(f'_ITEM{n}_name', String(255)))
-        columns.append(Column(f'_ITEM{n}_value', String(255)))
-    Table(table_name, metadata, *columns)
+    columns.extend(
+        Column(f'_ITEM{n}_{part}', String(255)) for n in range(1, 11) for part in ('name', 'value')
+    )
+    # Summary keys (see ensure_summary_key_columns for existing tables)
+    columns.extend(
+        Column(col, sa_type, Computed(expr, persisted=True))
+        for col, (sa_type, _, expr, _) in SUMMARY_KEY_COLUMNS.items()
+    )
+    return columns
+
 
+_ORDER_INT_COLUMNS = frozenset(c.name for c in _order_table_columns() if isinstance(c.type, Integer))
+# (brand_index, table_name) pairs whose DDL has been checked/created in this process
+_order_tables_ensured: Set[Tuple[int, str]] = set()
 
+
+def _ensure_order_table(engine, brand_index: int, table_name: str) -> bool:
+    key = (brand_index, table_name)
+    if key in _order_tables_ensured:
+        return True
+    metadata = MetaData()
+    Table(
+        table_name, metadata, *_order_table_columns(),
+        *[Index(f'idx_{col}', col) for col, (*_, indexed) in SUMMARY_KEY_COLUMNS.items() if indexed],
+    )
     with timed(f"DDL check/create for {table_name}"):
         try:
             metadata.create_all(engine, checkfirst=True)
         except SQLAlchemyError as e:
             logger.error(f"❌ Error creating table '{table_name}': {e}")
-            return
+            return False
+    _order_tables_ensured.add(key)
+    return True
+
+
+def _to_sql_executemany(pd_table, conn, keys, data_iter):
+    """
+    pandas to_sql `method=` callable: one plain INSERT run through the DBAPI cursor's
+    executemany, which mysql-connector rewrites into a single multi-row statement
+    without SQLAlchemy compiling a fresh N-row VALUES clause for every chunk.
+    """
+    columns = ", ".join(f"`{k}`" for k in keys)
+    placeholders = ", ".join(["%s"] * len(keys))
+    cur = conn.connection.cursor()
+    try:
+        cur.executemany(
+            f"INSERT INTO `{pd_table.name}` ({columns}) VALUES ({placeholders})",
+            list(data_iter),
+        )
+        return cur.rowcount
+    finally:
+        cur.close()
+
+
+def load_data_to_sql_optimized(df: pd.DataFrame, brand_index: int, brand_name: str, table_name: str, batch_size: int = 5000):
+    if df.empty:
+        logger.info(f"DataFrame empty for {table_name}; nothing to load.")
+        return
+
+    engine = sqlalchemy_engines.get(brand_index)
+    if not engine:
+        logger.error(f"No SQLAlchemy engine for brand {brand_index}")
+        return
 
+    if not _ensure_order_table(engine, brand_index, table_name):
+        return
 
+    if USE_LOAD_DATA_INFILE:
+        try:
+            with timed(f"LOAD DATA {len(df)} rows into {table_name}"):
+                _load_df_via_local_infile(engine, df, table_name, _ORDER_INT_COLUMNS)
+            logger.info(f"✅ [{brand_name}] Loaded {len(df)} rows to {table_name}")
+            return
+        except Exception as e:
+            logger.warning(f"⚠️ [{brand_name}] LOAD DATA LOCAL INFILE failed for {table_name} ({e}); falling back to to_sql")
 
     try:
-        optimal_batch = max(500, min(batch_size, 2000))
+        # Each chunk is one multi-row INSERT (see _to_sql_executemany); cap it well inside max_allowed_packet
+        optimal_batch = max(500, min(batch_size, 10000))
         with timed(f"Insert {len(df)} rows into {table_name} (batch={optimal_batch})"):
             with engine.begin() as conn:
-                df.to_sql(
-                    name=table_name,
-                    con=conn,              # ✅ use the held connection (NOT the engine)
-                    if_exists='append',
-                    index=False,
-                    method='multi',
-                    chunksize=optimal_batch,
-                )
+                if BULK_LOAD_RELAX_CHECKS:
+                    conn.execute(text(_BULK_LOAD_RELAX_SQL))
+                try:
+                    df.to_sql(
+                        name=table_name,
+                        con=conn,              # ✅ use the held connection (NOT the engine)
+                        if_exists='append',
+                        index=False,
+                        method=_to_sql_executemany,
+                        chunksize=optimal_batch,
+                    )
+                finally:
+                    if BULK_LOAD_RELAX_CHECKS:
+                        conn.execute(text(_BULK_LOAD_RESTORE_SQL))
 
         logger.info(f"✅ [{brand_name}] Loaded {len(df)} rows to {table_name}")
     except Exception as e:
-        logger.error(f"❌ Error loading data to '{table_name}': {e}")
-        traceback.print_exc()
+        # Re-check the DDL next time in case the table changed underneath us
+        _order_tables_ensured.discard((brand_index, table_name))
+        logger.exception(f"❌ Error loading data to '{table_name}': {e}")
 
 
 # ---------------------------
@@ -1730,79 +2353,158 @@ def ensure_summary_tables(cursor, connection):
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
         """)
 
-        # Ensure adjusted_total_sessions exists even if table was created earlier
-        try:
-            cursor.execute("""
-                ALTER TABLE overall_summary
-                ADD COLUMN adjusted_total_sessions INT DEFAULT 0
-            """)
-        except mysql.connector.Error:
-            # Column may already exist; ignore error
-            pass
-        
-        connection.commit()
+        # Ensure adjusted_total_sessions exists even if table was created earlier
+        # (look first so the common case doesn't attempt a failing ALTER every run)
+        cursor.execute("SHOW COLUMNS FROM overall_summary LIKE 'adjusted_total_sessions'")
+        if not cursor.fetchall():
+            cursor.execute("""
+                ALTER TABLE overall_summary
+                ADD COLUMN adjusted_total_sessions INT DEFAULT 0
+            """)
+        
+        connection.commit()
+
+
+SUMMARY_ORDERS_WINDOW = "summary_orders_window"
+SUMMARY_UPDATES_WINDOW = "summary_updates_window"
+# Parallel connections for the summaries that don't read other summaries (1 = serial)
+SUMMARY_PARALLEL_WORKERS = int(os.environ.get("SUMMARY_PARALLEL_WORKERS", "3"))
+
+# window table -> (source table, copied columns, filter, indexed key)
+_SUMMARY_WINDOW_SOURCES = {
+    SUMMARY_ORDERS_WINDOW: (
+        "shopify_orders",
+        ("order_id", "created_at", "created_date_d", "created_time", "payment_flags", "order_app_name",
+         "total_price", "discount_amount", "total_discounts", "shipping_price", "total_tax",
+         "line_item_quantity", "line_item_price",
+         "utm_source", "utm_medium", "utm_campaign", "utm_content", "utm_term"),
+        "created_date_d BETWEEN %s AND %s",
+        "created_date_d",
+    ),
+    SUMMARY_UPDATES_WINDOW: (
+        "shopify_orders_update",
+        ("order_id", "updated_date_d", "financial_status", "payment_flags", "order_app_name",
+         "total_price", "discount_amount"),
+        "financial_status NOT IN ('paid', 'pending') AND updated_date_d BETWEEN %s AND %s",
+        "updated_date_d",
+    ),
+}
+# MySQL types of the order table columns, so window DDL follows _order_table_columns
+_ORDER_COLUMN_SQL_TYPES = {
+    c.name: c.type.compile(dialect=mysql_dialect.dialect()) for c in _order_table_columns()
+}
+# Server-wide advisory lock name, scoped to the brand DB, held while a refresh uses the windows
+_SUMMARY_WINDOW_LOCK_SQL = "LEFT(CONCAT('summary_windows.', DATABASE()), 64)"
+# brand_index values whose window tables have been checked/created in this process
+_summary_windows_ready: Set[int] = set()
+
+
+def ensure_summary_windows(cursor, brand_index: int):
+    """
+    Create the fixed-name window tables from explicit DDL, once per brand per process
+    (under the window lock, so two processes never drop/create them at the same time).
+    A window whose columns no longer match _SUMMARY_WINDOW_SOURCES (e.g. created by an older
+    version) is dropped and recreated; otherwise the tables are reused across refreshes.
+    """
+    if brand_index in _summary_windows_ready:
+        return
+    for window, (_, cols, _, key) in _SUMMARY_WINDOW_SOURCES.items():
+        cursor.execute(
+            "SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s ORDER BY ORDINAL_POSITION",
+            (window,),
+        )
+        existing = tuple(row[0] for row in cursor.fetchall())
+        if existing == cols:
+            continue
+        if existing:
+            logger.info(f"🔁 Recreating {window}: columns changed")
+            cursor.execute(f"DROP TABLE {window}")
+        col_defs = ", ".join(f"{col} {_ORDER_COLUMN_SQL_TYPES[col]}" for col in cols)
+        cursor.execute(
+            f"CREATE TABLE {window} ({col_defs}, KEY idx_{key} ({key})) "
+            f"ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+        )
+    _summary_windows_ready.add(brand_index)
+
+
+def acquire_summary_windows(cursor) -> bool:
+    """Take the brand DB's window lock without waiting; False if another refresh holds it."""
+    cursor.execute(f"SELECT GET_LOCK({_SUMMARY_WINDOW_LOCK_SQL}, 0)")
+    row = cursor.fetchone()
+    return bool(row and row[0] == 1)
+
+
+def release_summary_windows(cursor):
+    cursor.execute(f"SELECT RELEASE_LOCK({_SUMMARY_WINDOW_LOCK_SQL})")
+    cursor.fetchall()
+
 
+def materialize_summary_windows(cursor, connection, brand_name: str, min_date: str, max_date: str):
+    """Refill the window tables with the summary source rows for [min_date, max_date].
 
-def merge_staging_to_main_by_date(cursor, connection, table_name, staging_table_name, brand_name, batch_size=5):
+    Every update_*_incremental then scans these small tables instead of re-reading the same
+    range of shopify_orders / shopify_orders_update once per summary. Only the columns the
+    summaries use are copied, and the updates window is pre-filtered to returned/cancelled rows.
+    They are regular tables (not TEMPORARY) so summary workers on other connections can read them;
+    the caller must hold the window lock (acquire_summary_windows) until the refresh is done.
     """
-    Safely merges data from staging_table_name into table_name by date chunks.
-    Main table is locked only for small DELETE+INSERT per date.
+    with timed(f"[{brand_name}] Materialize summary windows ({min_date} to {max_date})"):
+        cursor.execute("START TRANSACTION")
+        try:
+            for window, (source, cols, where, _) in _SUMMARY_WINDOW_SOURCES.items():
+                col_list = ", ".join(cols)
+                cursor.execute(f"DELETE FROM {window}")
+                cursor.execute(
+                    f"INSERT INTO {window} ({col_list}) SELECT {col_list} FROM {source} WHERE {where}",
+                    (min_date, max_date),
+                )
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+
+
+def prewarm_summary_sources(cursor, brand_name: str, min_date: str, max_date: str):
+    """Touch the [min_date, max_date] rows of the base tables once so the summaries hit the buffer pool.
+
+    Only used when the window tables are off or unavailable; the non-indexed column forces the
+    clustered-index pages in, not just the date index.
     """
-    logger.debug(f"🔍 [{brand_name}] Starting staging merge from {staging_table_name} to {table_name}")
-    
-    # 1. Fetch distinct dates
-    cursor.execute(f"SELECT DISTINCT date FROM {staging_table_name} ORDER BY date")
-    rows = cursor.fetchall()
-    
-    # Extract dates safely (handles both dictionary and tuple cursors)
-    affected_dates = []
-    for r in rows:
-        val = r['date'] if isinstance(r, dict) else r[0]
-        if val:
-            affected_dates.append(val)
-    
-    if not affected_dates:
-        logger.info(f"✔️ No dates found in {staging_table_name} for {brand_name}")
-        return
+    with timed(f"[{brand_name}] Prewarm summary sources ({min_date} to {max_date})"):
+        for table, key in (("shopify_orders", "created_date_d"), ("shopify_orders_update", "updated_date_d")):
+            cursor.execute(
+                f"SELECT COUNT(total_price) FROM {table} WHERE {key} BETWEEN %s AND %s",
+                (min_date, max_date),
+            )
+            cursor.fetchall()
 
-    logger.info(f"🔄 [{brand_name}] Found {len(affected_dates)} dates to merge into {table_name}: {affected_dates}")
 
-    # 2. Merge in chunks
-    for i in range(0, len(affected_dates), batch_size):
-        chunk = affected_dates[i : i + batch_size]
-        chunk_str = ", ".join(str(d) for d in chunk)
-        logger.debug(f"   ⏳ [{brand_name}] Processing batch: {chunk_str}")
-        
-        for d in chunk:
-            date_str = str(d)
-            # Delete and Re-insert for the specific date
-            cursor.execute(f"DELETE FROM {table_name} WHERE date = %s", (date_str,))
-            deleted_count = cursor.rowcount
-            
-            cursor.execute(f"INSERT INTO {table_name} SELECT * FROM {staging_table_name} WHERE date = %s", (date_str,))
-            inserted_count = cursor.rowcount
-            
-            logger.debug(f"      ✅ [{brand_name}] Date {date_str}: Deleted {deleted_count} rows, Inserted {inserted_count} rows")
-        
-        connection.commit()
-        logger.info(f"   🚀 [{brand_name}] Merged {min(i + batch_size, len(affected_dates))}/{len(affected_dates)} dates into {table_name}")
+def _run_summary_job(brand_index: int, job, *args):
+    """Run one update_*_incremental on its own pooled connection."""
+    with get_db_cursor(brand_index, dictionary=False) as (cursor, connection):
+        job(cursor, connection, *args)
 
-    logger.info(f"🏁 [{brand_name}] Completed merge into {table_name}")
 
+def update_sales_summary_incremental(cursor, connection, brand_name: str, dates: Set[str],
+                                     orders_table: str = "shopify_orders",
+                                     updates_table: str = "shopify_orders_update"):
+    """Update sales_summary for the exact set of affected dates only.
 
-def update_sales_summary_incremental(cursor, connection, brand_name: str, min_date: str, max_date: str):
-    """Update sales_summary for affected date range only.
-    Refactored to use STAGING table for chunked merge.
+    Unlike the range-based summaries, this refreshes O(changed days): the rows for
+    `dates` are recomputed from shopify_orders / shopify_orders_update / returns_fact
+    and upserted on the date key inside one transaction, using IN-list lookups.
+    Requested dates that no longer have any source rows are deleted.
     """
-    with timed(f"[{brand_name}] sales_summary incremental ({min_date} to {max_date})"):
-        # STEP 1: Create staging table
-        cursor.execute("CREATE TABLE IF NOT EXISTS sales_summary_stage LIKE sales_summary")
-        # STEP 2: Clear staging table
-        cursor.execute("TRUNCATE TABLE sales_summary_stage")
-        
-        # STEP 3: Populate staging table
-        sql = """
-        INSERT INTO sales_summary_stage (
+    if not dates:
+        return
+
+    date_list = sorted(dates)
+    in_list = ",".join(["%s"] * len(date_list))
+
+    with timed(f"[{brand_name}] sales_summary incremental ({len(date_list)} dates: {date_list[0]} to {date_list[-1]})"):
+        sql = f"""
+        INSERT INTO sales_summary (
             date, gokwik_sales, gokwik_returns, actual_gokwik_sale,
             KwikEngageSales, KwikEngageReturns, actual_KwikEngage_sale,
             online_store_sales, online_store_returns, actual_online_store_sale,
@@ -1816,47 +2518,63 @@ def update_sales_summary_incremental(cursor, connection, brand_name: str, min_da
             overall_sales_WO_hypd, overall_returns_WO_hypd, actual_overall_sales_WO_hypd,
             overall_sales, overall_returns, actual_overall_sales
         )
-        WITH SalesData AS (
+        WITH SalesByApp AS (
+            SELECT
+                created_date_d AS date,
+                order_app_name,
+                SUM(total_price) AS amount
+            FROM {orders_table}
+            WHERE created_date_d IN ({in_list})
+            GROUP BY created_date_d, order_app_name
+        ),
+        SalesData AS (
             SELECT
-                STR_TO_DATE(created_date, '%Y-%m-%d') AS date,
-                SUM(CASE WHEN order_app_name = 'GoKwik' THEN total_price ELSE 0 END) AS gokwik_sales,
-                SUM(CASE WHEN order_app_name = 'KwikEngage' THEN total_price ELSE 0 END) AS kwik_engage_sales,
-                SUM(CASE WHEN order_app_name = 'Online Store' THEN total_price ELSE 0 END) AS online_store_sales,
-                SUM(CASE WHEN order_app_name = 'HYPD_store' THEN total_price ELSE 0 END) AS hypd_store_sales,
-                SUM(CASE WHEN order_app_name = 'Draft Order' THEN total_price ELSE 0 END) AS draft_order_sales,
-                SUM(CASE WHEN order_app_name = 'Dpanda' THEN total_price ELSE 0 END) AS dpanda_sales,
-                SUM(CASE WHEN order_app_name = 'GKAppbrew' THEN total_price ELSE 0 END) AS gkappbrew_sales,
-                SUM(CASE WHEN order_app_name = 'BuyKaro' THEN total_price ELSE 0 END) AS buykaro_sales,
-                SUM(CASE WHEN order_app_name = 'AppbrewPlus' THEN total_price ELSE 0 END) AS appbrewplus_sales,
-                SUM(CASE WHEN order_app_name = 'Shopflo' THEN total_price ELSE 0 END) AS shopflo_sales,
-                SUM(total_price) AS global_overall_sales,
-                SUM(CASE WHEN order_app_name != 'HYPD_store' THEN total_price ELSE 0 END) AS global_sales_WO_hypd
-            FROM shopify_orders
-            WHERE created_date BETWEEN %s AND %s
+                date,
+                SUM(CASE WHEN order_app_name = 'GoKwik' THEN amount ELSE 0 END) AS gokwik_sales,
+                SUM(CASE WHEN order_app_name = 'KwikEngage' THEN amount ELSE 0 END) AS kwik_engage_sales,
+                SUM(CASE WHEN order_app_name = 'Online Store' THEN amount ELSE 0 END) AS online_store_sales,
+                SUM(CASE WHEN order_app_name = 'HYPD_store' THEN amount ELSE 0 END) AS hypd_store_sales,
+                SUM(CASE WHEN order_app_name = 'Draft Order' THEN amount ELSE 0 END) AS draft_order_sales,
+                SUM(CASE WHEN order_app_name = 'Dpanda' THEN amount ELSE 0 END) AS dpanda_sales,
+                SUM(CASE WHEN order_app_name = 'GKAppbrew' THEN amount ELSE 0 END) AS gkappbrew_sales,
+                SUM(CASE WHEN order_app_name = 'BuyKaro' THEN amount ELSE 0 END) AS buykaro_sales,
+                SUM(CASE WHEN order_app_name = 'AppbrewPlus' THEN amount ELSE 0 END) AS appbrewplus_sales,
+                SUM(CASE WHEN order_app_name = 'Shopflo' THEN amount ELSE 0 END) AS shopflo_sales,
+                SUM(amount) AS global_overall_sales,
+                SUM(CASE WHEN order_app_name != 'HYPD_store' THEN amount ELSE 0 END) AS global_sales_WO_hypd
+            FROM SalesByApp
             GROUP BY date
         ),
+        ReturnsByApp AS (
+            SELECT
+                updated_date_d AS date,
+                order_app_name,
+                SUM(total_price) AS amount
+            FROM {updates_table}
+            WHERE financial_status NOT IN ('paid', 'pending') AND updated_date_d IN ({in_list})
+            GROUP BY updated_date_d, order_app_name
+        ),
         ReturnsData AS (
             SELECT
-                STR_TO_DATE(updated_date, '%Y-%m-%d') AS date,
-                SUM(CASE WHEN order_app_name = 'GoKwik' THEN total_price ELSE 0 END) AS gokwik_returns,
-                SUM(CASE WHEN order_app_name = 'KwikEngage' THEN total_price ELSE 0 END) AS kwik_engage_returns,
-                SUM(CASE WHEN order_app_name = 'Online Store' THEN total_price ELSE 0 END) AS online_store_returns,
-                SUM(CASE WHEN order_app_name = 'HYPD_store' THEN total_price ELSE 0 END) AS hypd_store_returns,
-                SUM(CASE WHEN order_app_name = 'Draft Order' THEN total_price ELSE 0 END) AS draft_order_returns,
-                SUM(CASE WHEN order_app_name = 'Dpanda' THEN total_price ELSE 0 END) AS dpanda_returns,
-                SUM(CASE WHEN order_app_name = 'GKAppbrew' THEN total_price ELSE 0 END) AS gkappbrew_returns,
-                SUM(CASE WHEN order_app_name = 'BuyKaro' THEN total_price ELSE 0 END) AS buykaro_returns,
-                SUM(CASE WHEN order_app_name = 'AppbrewPlus' THEN total_price ELSE 0 END) AS appbrewplus_returns,
-                SUM(CASE WHEN order_app_name = 'Shopflo' THEN total_price ELSE 0 END) AS shopflo_returns,
-                SUM(CASE WHEN order_app_name != 'HYPD_store' THEN total_price ELSE 0 END) AS global_returns_WO_hypd
-            FROM shopify_orders_update
-            WHERE financial_status NOT IN ('paid', 'pending') AND updated_date BETWEEN %s AND %s
+                date,
+                SUM(CASE WHEN order_app_name = 'GoKwik' THEN amount ELSE 0 END) AS gokwik_returns,
+                SUM(CASE WHEN order_app_name = 'KwikEngage' THEN amount ELSE 0 END) AS kwik_engage_returns,
+                SUM(CASE WHEN order_app_name = 'Online Store' THEN amount ELSE 0 END) AS online_store_returns,
+                SUM(CASE WHEN order_app_name = 'HYPD_store' THEN amount ELSE 0 END) AS hypd_store_returns,
+                SUM(CASE WHEN order_app_name = 'Draft Order' THEN amount ELSE 0 END) AS draft_order_returns,
+                SUM(CASE WHEN order_app_name = 'Dpanda' THEN amount ELSE 0 END) AS dpanda_returns,
+                SUM(CASE WHEN order_app_name = 'GKAppbrew' THEN amount ELSE 0 END) AS gkappbrew_returns,
+                SUM(CASE WHEN order_app_name = 'BuyKaro' THEN amount ELSE 0 END) AS buykaro_returns,
+                SUM(CASE WHEN order_app_name = 'AppbrewPlus' THEN amount ELSE 0 END) AS appbrewplus_returns,
+                SUM(CASE WHEN order_app_name = 'Shopflo' THEN amount ELSE 0 END) AS shopflo_returns,
+                SUM(CASE WHEN order_app_name != 'HYPD_store' THEN amount ELSE 0 END) AS global_returns_WO_hypd
+            FROM ReturnsByApp
             GROUP BY date
         ),
         RefundsByDate AS (
             SELECT event_date AS date, SUM(amount) AS overall_returns
             FROM returns_fact
-            WHERE event_type = 'REFUND' AND event_date BETWEEN %s AND %s
+            WHERE event_type = 'REFUND' AND event_date IN ({in_list})
             GROUP BY event_date
         ),
         AllDates AS (
@@ -1864,7 +2582,7 @@ def update_sales_summary_incremental(cursor, connection, brand_name: str, min_da
             UNION SELECT DISTINCT date FROM ReturnsData
             UNION SELECT DISTINCT date FROM RefundsByDate
         )
-        SELECT
+        SELECT /*+ BNL(s, r, rfd) */
             d.date,
             COALESCE(s.gokwik_sales, 0), COALESCE(r.gokwik_returns, 0),
             COALESCE(s.gokwik_sales, 0) - COALESCE(r.gokwik_returns, 0),
@@ -1908,31 +2626,113 @@ def update_sales_summary_incremental(cursor, connection, brand_name: str, min_da
         LEFT JOIN SalesData s ON d.date = s.date
         LEFT JOIN ReturnsData r ON d.date = r.date
         LEFT JOIN RefundsByDate rfd ON d.date = rfd.date
+        ON DUPLICATE KEY UPDATE
+            gokwik_sales = VALUES(gokwik_sales), gokwik_returns = VALUES(gokwik_returns),
+            actual_gokwik_sale = VALUES(actual_gokwik_sale),
+            KwikEngageSales = VALUES(KwikEngageSales), KwikEngageReturns = VALUES(KwikEngageReturns),
+            actual_KwikEngage_sale = VALUES(actual_KwikEngage_sale),
+            online_store_sales = VALUES(online_store_sales), online_store_returns = VALUES(online_store_returns),
+            actual_online_store_sale = VALUES(actual_online_store_sale),
+            hypd_store_sales = VALUES(hypd_store_sales), hypd_store_returns = VALUES(hypd_store_returns),
+            actual_hypd_store_sale = VALUES(actual_hypd_store_sale),
+            draft_order_sales = VALUES(draft_order_sales), draft_order_returns = VALUES(draft_order_returns),
+            actual_draft_order_sale = VALUES(actual_draft_order_sale),
+            dpanda_sales = VALUES(dpanda_sales), dpanda_returns = VALUES(dpanda_returns),
+            actual_dpanda_sale = VALUES(actual_dpanda_sale),
+            gkappbrew_sales = VALUES(gkappbrew_sales), gkappbrew_returns = VALUES(gkappbrew_returns),
+            actual_gkappbrew_sale = VALUES(actual_gkappbrew_sale),
+            buykaro_sales = VALUES(buykaro_sales), buykaro_returns = VALUES(buykaro_returns),
+            actual_buykaro_sale = VALUES(actual_buykaro_sale),
+            appbrewplus_sales = VALUES(appbrewplus_sales), appbrewplus_returns = VALUES(appbrewplus_returns),
+            actual_appbrewplus_sale = VALUES(actual_appbrewplus_sale),
+            shopflo_sales = VALUES(shopflo_sales), shopflo_returns = VALUES(shopflo_returns),
+            actual_shopflo_sale = VALUES(actual_shopflo_sale),
+            overall_sales_WO_hypd = VALUES(overall_sales_WO_hypd),
+            overall_returns_WO_hypd = VALUES(overall_returns_WO_hypd),
+            actual_overall_sales_WO_hypd = VALUES(actual_overall_sales_WO_hypd),
+            overall_sales = VALUES(overall_sales), overall_returns = VALUES(overall_returns),
+            actual_overall_sales = VALUES(actual_overall_sales)
+        """
+        params = tuple(date_list) * 3
+
+        # Dates that still have source rows; anything else in `dates` is stale and removed
+        present_sql = f"""
+            SELECT created_date_d FROM {orders_table}
+            WHERE created_date_d IN ({in_list})
+            UNION
+            SELECT updated_date_d FROM {updates_table}
+            WHERE financial_status NOT IN ('paid', 'pending') AND updated_date_d IN ({in_list})
+            UNION
+            SELECT event_date FROM returns_fact
+            WHERE event_type = 'REFUND' AND event_date IN ({in_list})
         """
-        cursor.execute(sql, (min_date, max_date, min_date, max_date, min_date, max_date))
-        connection.commit()
 
-        # STEP 4 & 5: Fetch affected dates and merge
-        merge_staging_to_main_by_date(cursor, connection, "sales_summary", "sales_summary_stage", brand_name)
+        cursor.execute("START TRANSACTION")
+        try:
+            cursor.execute(present_sql, params)
+            present = set()
+            for row in cursor.fetchall():
+                d = next(iter(row.values())) if isinstance(row, dict) else row[0]
+                if d is not None:
+                    present.add(d.isoformat() if hasattr(d, "isoformat") else str(d))
+            stale = [d for d in date_list if d not in present]
+            if stale:
+                cursor.execute(
+                    f"DELETE FROM sales_summary WHERE date IN ({','.join(['%s'] * len(stale))})",
+                    tuple(stale),
+                )
+            cursor.execute(sql, params)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
 
 
-def update_order_summary_incremental(cursor, connection, brand_name: str, min_date: str, max_date: str):
+def update_order_summary_incremental(cursor, connection, brand_name: str, min_date: str, max_date: str,
+                                     orders_table: str = "shopify_orders",
+                                     updates_table: str = "shopify_orders_update"):
     """Update order_summary for affected date range only (with partially paid tracking).
-    Refactored to use STAGING table for chunked merge.
+    Rows are upserted on the primary key in a single statement.
     """
     with timed(f"[{brand_name}] order_summary incremental ({min_date} to {max_date})"):
-        # STEP 1: Create staging table
-        cursor.execute("CREATE TABLE IF NOT EXISTS order_summary_stage LIKE order_summary")
-        # STEP 2: Clear staging table
-        cursor.execute("TRUNCATE TABLE order_summary_stage")
-
-        # STEP 3: Populate staging table
-        sql = """
-        INSERT INTO order_summary_stage (
+        # Recompute the affected days and upsert them in place on the primary key
+        sql = f"""
+        INSERT INTO order_summary (
             date, number_of_orders_created, number_of_orders_returned, actual_number_of_orders,
             cod_orders, prepaid_orders, partially_paid_orders,
             overall_cod_orders, overall_prepaid_orders, overall_partially_paid_orders
         )
+        WITH CreatedOrders AS (
+            -- One row per (day, order): an order is in a bucket if any of its line rows match
+            SELECT
+                created_date_d AS date,
+
+                -- COD: blank gateway or COD keywords
+                MAX((payment_flags & 3) <> 0) AS is_cod,
+                -- Prepaid: not blank, COD, or Gokwik PPCOD
+                MAX(payment_flags = 0) AS is_prepaid,
+                -- Partially paid (Gokwik PPCOD)
+                MAX((payment_flags & 4) <> 0) AS is_partially_paid
+            FROM {orders_table}
+            WHERE created_date_d BETWEEN %s AND %s AND order_id IS NOT NULL
+            GROUP BY created_date_d, order_id
+        ),
+        ReturnedOrders AS (
+            -- Same per-order flags for returned/cancelled orders
+            SELECT
+                updated_date_d AS date,
+
+                -- COD: blank gateway or COD keywords
+                MAX((payment_flags & 3) <> 0) AS is_cod,
+                -- Prepaid: not blank, COD, or Gokwik PPCOD
+                MAX(payment_flags = 0) AS is_prepaid,
+                -- Partially paid (Gokwik PPCOD)
+                MAX((payment_flags & 4) <> 0) AS is_partially_paid
+            FROM {updates_table}
+            WHERE financial_status NOT IN ('paid', 'pending')
+              AND updated_date_d BETWEEN %s AND %s AND order_id IS NOT NULL
+            GROUP BY updated_date_d, order_id
+        )
         SELECT
             date,
             SUM(orders_created) AS number_of_orders_created,
@@ -1945,120 +2745,67 @@ def update_order_summary_incremental(cursor, connection, brand_name: str, min_da
             SUM(prepaid_created) AS overall_prepaid_orders,
             SUM(partially_paid_created) AS overall_partially_paid_orders
         FROM (
-            SELECT 
-                STR_TO_DATE(created_date, '%Y-%m-%d') AS date,
-                COUNT(DISTINCT order_id) AS orders_created,
-                0 AS orders_returned,
-
-                -- COD created: includes NULL, empty, and COD keywords
-                COUNT(DISTINCT CASE 
-                    WHEN payment_gateway_names IS NULL 
-                      OR payment_gateway_names = '' 
-                      OR payment_gateway_names LIKE '%Cash on Delivery (COD)%' 
-                      OR payment_gateway_names LIKE '%cash_on_delivery%' 
-                    THEN order_id END) AS cod_created,
-
-                0 AS cod_returned,
-
-                -- Prepaid created: exclude COD, blank, and Gokwik PPCOD
-                COUNT(DISTINCT CASE 
-                    WHEN payment_gateway_names IS NOT NULL 
-                      AND payment_gateway_names != '' 
-                      AND NOT (payment_gateway_names LIKE '%Cash on Delivery (COD)%'
-                          OR payment_gateway_names LIKE '%cash_on_delivery%'
-                          OR payment_gateway_names LIKE '%Gokwik PPCOD%')
-                    THEN order_id END) AS prepaid_created,
-
-                0 AS prepaid_returned,
-
-                -- Partially paid created (Gokwik PPCOD)
-                COUNT(DISTINCT CASE 
-                    WHEN payment_gateway_names LIKE '%Gokwik PPCOD%' 
-                    THEN order_id END) AS partially_paid_created,
-
-                0 AS partially_paid_returned
-
-            FROM shopify_orders
-            WHERE created_date BETWEEN %s AND %s
-            GROUP BY created_date
+            SELECT
+                date,
+                COUNT(*) AS orders_created, 0 AS orders_returned,
+                SUM(is_cod) AS cod_created, 0 AS cod_returned,
+                SUM(is_prepaid) AS prepaid_created, 0 AS prepaid_returned,
+                SUM(is_partially_paid) AS partially_paid_created, 0 AS partially_paid_returned
+            FROM CreatedOrders
+            GROUP BY date
 
             UNION ALL
 
-            SELECT 
-                STR_TO_DATE(updated_date, '%Y-%m-%d') AS date,
-                0 AS orders_created,
-                COUNT(DISTINCT order_id) AS orders_returned,
-
-                0 AS cod_created,
-
-                -- COD returned: includes NULL, empty, and COD keywords
-                COUNT(DISTINCT CASE 
-                    WHEN payment_gateway_names IS NULL 
-                      OR payment_gateway_names = '' 
-                      OR payment_gateway_names LIKE '%Cash on Delivery (COD)%' 
-                      OR payment_gateway_names LIKE '%cash_on_delivery%' 
-                    THEN order_id END) AS cod_returned,
-
-                0 AS prepaid_created,
-
-                -- Prepaid returned
-                COUNT(DISTINCT CASE 
-                    WHEN payment_gateway_names IS NOT NULL 
-                      AND payment_gateway_names != '' 
-                      AND NOT (payment_gateway_names LIKE '%Cash on Delivery (COD)%'
-                          OR payment_gateway_names LIKE '%cash_on_delivery%'
-                          OR payment_gateway_names LIKE '%Gokwik PPCOD%')
-                    THEN order_id END) AS prepaid_returned,
-
-                0 AS partially_paid_created,
-
-                -- Partially paid returned
-                COUNT(DISTINCT CASE 
-                    WHEN payment_gateway_names LIKE '%Gokwik PPCOD%' 
-                    THEN order_id END) AS partially_paid_returned
-
-            FROM shopify_orders_update
-            WHERE financial_status NOT IN ('paid', 'pending')
-              AND updated_date BETWEEN %s AND %s
-            GROUP BY updated_date
+            SELECT
+                date,
+                0 AS orders_created, COUNT(*) AS orders_returned,
+                0 AS cod_created, SUM(is_cod) AS cod_returned,
+                0 AS prepaid_created, SUM(is_prepaid) AS prepaid_returned,
+                0 AS partially_paid_created, SUM(is_partially_paid) AS partially_paid_returned
+            FROM ReturnedOrders
+            GROUP BY date
         ) AS combined
         WHERE date IS NOT NULL
         GROUP BY date
+        ON DUPLICATE KEY UPDATE
+            number_of_orders_created = VALUES(number_of_orders_created),
+            number_of_orders_returned = VALUES(number_of_orders_returned),
+            actual_number_of_orders = VALUES(actual_number_of_orders),
+            cod_orders = VALUES(cod_orders),
+            prepaid_orders = VALUES(prepaid_orders),
+            partially_paid_orders = VALUES(partially_paid_orders),
+            overall_cod_orders = VALUES(overall_cod_orders),
+            overall_prepaid_orders = VALUES(overall_prepaid_orders),
+            overall_partially_paid_orders = VALUES(overall_partially_paid_orders)
         """
         cursor.execute(sql, (min_date, max_date, min_date, max_date))
         connection.commit()
 
-        # STEP 4 & 5: Fetch affected dates and merge
-        merge_staging_to_main_by_date(cursor, connection, "order_summary", "order_summary_stage", brand_name)
 
-
-def update_discount_summary_incremental(cursor, connection, brand_name: str, min_date: str, max_date: str):
+def update_discount_summary_incremental(cursor, connection, brand_name: str, min_date: str, max_date: str,
+                                        orders_table: str = "shopify_orders",
+                                        updates_table: str = "shopify_orders_update"):
     """Update discount_summary for affected date range only.
-    Refactored to use STAGING table for chunked merge.
+    Rows are upserted on the primary key in a single statement.
     """
     with timed(f"[{brand_name}] discount_summary incremental ({min_date} to {max_date})"):
-        # STEP 1: Create staging table
-        cursor.execute("CREATE TABLE IF NOT EXISTS discount_summary_stage LIKE discount_summary")
-        # STEP 2: Clear staging table
-        cursor.execute("TRUNCATE TABLE discount_summary_stage")
-        
-        # STEP 3: Populate staging table
-        sql = """
-        INSERT INTO discount_summary_stage (date, total_discounts_given, total_discount_on_returns, actual_discounts)
+        # Recompute the affected days and upsert them in place on the primary key
+        sql = f"""
+        INSERT INTO discount_summary (date, total_discounts_given, total_discount_on_returns, actual_discounts)
         WITH DiscountsGiven AS (
             SELECT 
-                STR_TO_DATE(created_date, '%Y-%m-%d') AS date, 
+                created_date_d AS date, 
                 SUM(COALESCE(discount_amount, 0)) AS total_discounts_given
-            FROM shopify_orders 
-            WHERE created_date BETWEEN %s AND %s
+            FROM {orders_table} 
+            WHERE created_date_d BETWEEN %s AND %s
             GROUP BY date
         ),
         DiscountsReturned AS (
             SELECT 
-                STR_TO_DATE(updated_date, '%Y-%m-%d') AS date, 
+                updated_date_d AS date, 
                 SUM(COALESCE(discount_amount, 0)) AS total_discount_on_returns
-            FROM shopify_orders_update 
-            WHERE financial_status NOT IN ('paid', 'pending') AND updated_date BETWEEN %s AND %s
+            FROM {updates_table} 
+            WHERE financial_status NOT IN ('paid', 'pending') AND updated_date_d BETWEEN %s AND %s
             GROUP BY date
         ),
         AllDates AS (
@@ -2074,38 +2821,35 @@ def update_discount_summary_incremental(cursor, connection, brand_name: str, min
         FROM AllDates d
         LEFT JOIN DiscountsGiven dg ON d.date = dg.date
         LEFT JOIN DiscountsReturned dr ON d.date = dr.date
+        ON DUPLICATE KEY UPDATE
+            total_discounts_given = VALUES(total_discounts_given),
+            total_discount_on_returns = VALUES(total_discount_on_returns),
+            actual_discounts = VALUES(actual_discounts)
         """
         cursor.execute(sql, (min_date, max_date, min_date, max_date))
         connection.commit()
 
-        # STEP 4 & 5: Fetch affected dates and merge
-        merge_staging_to_main_by_date(cursor, connection, "discount_summary", "discount_summary_stage", brand_name)
 
-
-def update_gross_summary_incremental(cursor, connection, brand_name: str, min_date: str, max_date: str):
+def update_gross_summary_incremental(cursor, connection, brand_name: str, min_date: str, max_date: str,
+                                     orders_table: str = "shopify_orders"):
     """Update gross_summary for affected date range only.
-    Refactored to use STAGING table for chunked merge.
+    Rows are upserted on the primary key in a single statement.
     """
     with timed(f"[{brand_name}] gross_summary incremental ({min_date} to {max_date})"):
-        # STEP 1: Create staging table
-        cursor.execute("CREATE TABLE IF NOT EXISTS gross_summary_stage LIKE gross_summary")
-        # STEP 2: Clear staging table
-        cursor.execute("TRUNCATE TABLE gross_summary_stage")
-        
-        # STEP 3: Populate staging table
-        sql = """
-        INSERT INTO gross_summary_stage (
+        # Recompute the affected days and upsert them in place on the primary key
+        sql = f"""
+        INSERT INTO gross_summary (
             date, overall_sale, shipping_total, discounts_total, tax_total, 
             gross_sales, actual_discounts, net_sales
         )
         WITH ShopifyAggregates AS (
             SELECT
-                STR_TO_DATE(created_date, '%Y-%m-%d') AS date,
+                created_date_d AS date,
                 SUM(COALESCE(line_item_quantity, 0) * COALESCE(line_item_price, 0)) AS overall_sale,
                 SUM(COALESCE(shipping_price, 0)) AS shipping_total,
                 SUM(COALESCE(total_tax, 0)) AS tax_total
-            FROM shopify_orders 
-            WHERE created_date BETWEEN %s AND %s
+            FROM {orders_table} 
+            WHERE created_date_d BETWEEN %s AND %s
             GROUP BY date
         )
         SELECT
@@ -2119,43 +2863,37 @@ def update_gross_summary_incremental(cursor, connection, brand_name: str, min_da
             ((sa.overall_sale * 0.84) - COALESCE(ds.actual_discounts, 0)) AS net_sales
         FROM ShopifyAggregates sa
         LEFT JOIN discount_summary ds ON sa.date = ds.date
+        ON DUPLICATE KEY UPDATE
+            overall_sale = VALUES(overall_sale),
+            shipping_total = VALUES(shipping_total),
+            discounts_total = VALUES(discounts_total),
+            tax_total = VALUES(tax_total),
+            gross_sales = VALUES(gross_sales),
+            actual_discounts = VALUES(actual_discounts),
+            net_sales = VALUES(net_sales)
         """
         cursor.execute(sql, (min_date, max_date))
         connection.commit()
 
-        # STEP 4 & 5: Fetch affected dates and merge
-        merge_staging_to_main_by_date(cursor, connection, "gross_summary", "gross_summary_stage", brand_name)
 
-
-def update_hour_wise_sales_incremental(cursor, connection, brand_name: str, min_date: str, max_date: str):
+def update_hour_wise_sales_incremental(cursor, connection, brand_name: str, min_date: str, max_date: str,
+                                       orders_table: str = "shopify_orders"):
     """Update hour_wise_sales for affected date range only.
-    Refactored to use STAGING table for chunked merge.
+    Hours in the range that no longer have orders or sessions are deleted, and the rest are
+    upserted on the primary key, in one transaction.
     """
     with timed(f"[{brand_name}] hour_wise_sales incremental ({min_date} to {max_date})"):
-        # STEP 1: Create staging table
-        cursor.execute("CREATE TABLE IF NOT EXISTS hour_wise_sales_stage LIKE hour_wise_sales")
-        # STEP 2: Clear staging table
-        cursor.execute("TRUNCATE TABLE hour_wise_sales_stage")
-        
-        # STEP 3: Populate staging table
-        sql = """
-        INSERT INTO hour_wise_sales_stage (
-            date, hour, number_of_orders, total_sales, number_of_prepaid_orders, 
-            number_of_cod_orders, number_of_sessions, number_of_atc_sessions
-        )
+        keys_cte = f"""
         WITH HourlySales AS (
             SELECT
-                STR_TO_DATE(created_date, '%Y-%m-%d') AS date,
+                created_date_d AS date,
                 HOUR(created_time) AS hour,
                 COUNT(DISTINCT order_id) AS number_of_orders,
                 SUM(COALESCE(total_price, 0)) AS total_sales,
-                COUNT(DISTINCT CASE WHEN (payment_gateway_names IS NOT NULL AND payment_gateway_names != '') 
-                    AND NOT (payment_gateway_names LIKE '%Cash on Delivery (COD)%' 
-                    OR payment_gateway_names LIKE '%cash_on_delivery%') THEN order_id END) AS number_of_prepaid_orders,
-                COUNT(DISTINCT CASE WHEN payment_gateway_names LIKE '%Cash on Delivery (COD)%' 
-                    OR payment_gateway_names LIKE '%cash_on_delivery%' THEN order_id END) AS number_of_cod_orders
-            FROM shopify_orders
-            WHERE created_date BETWEEN %s AND %s 
+                COUNT(DISTINCT CASE WHEN (payment_flags & 3) = 0 THEN order_id END) AS number_of_prepaid_orders,
+                COUNT(DISTINCT CASE WHEN (payment_flags & 2) <> 0 THEN order_id END) AS number_of_cod_orders
+            FROM {orders_table}
+            WHERE created_date_d BETWEEN %s AND %s 
                 AND created_time IS NOT NULL
             GROUP BY date, hour
         ),
@@ -2173,6 +2911,23 @@ def update_hour_wise_sales_incremental(cursor, connection, brand_name: str, min_
             UNION
             SELECT date, hour FROM HourlySessions
         )
+        """
+
+        # Hours that lost all their orders and sessions (the old delete-then-insert dropped them)
+        delete_sql = f"""
+        {keys_cte}
+        DELETE h FROM hour_wise_sales h
+        LEFT JOIN AllKeys ak ON ak.date = h.date AND ak.hour = h.hour
+        WHERE h.date BETWEEN %s AND %s AND ak.date IS NULL
+        """
+
+        # Recompute the affected days and upsert them in place on the primary key
+        sql = f"""
+        INSERT INTO hour_wise_sales (
+            date, hour, number_of_orders, total_sales, number_of_prepaid_orders, 
+            number_of_cod_orders, number_of_sessions, number_of_atc_sessions
+        )
+        {keys_cte}
         SELECT
             ak.date, 
             ak.hour, 
@@ -2185,27 +2940,34 @@ def update_hour_wise_sales_incremental(cursor, connection, brand_name: str, min_
         FROM AllKeys ak
         LEFT JOIN HourlySales hs ON ak.date = hs.date AND ak.hour = hs.hour
         LEFT JOIN HourlySessions ss ON ak.date = ss.date AND ak.hour = ss.hour
+        ON DUPLICATE KEY UPDATE
+            number_of_orders = VALUES(number_of_orders),
+            total_sales = VALUES(total_sales),
+            number_of_prepaid_orders = VALUES(number_of_prepaid_orders),
+            number_of_cod_orders = VALUES(number_of_cod_orders),
+            number_of_sessions = VALUES(number_of_sessions),
+            number_of_atc_sessions = VALUES(number_of_atc_sessions)
         """
-        cursor.execute(sql, (min_date, max_date, min_date, max_date))
-        connection.commit()
+        params = (min_date, max_date, min_date, max_date)
 
-        # STEP 4 & 5: Fetch affected dates and merge
-        merge_staging_to_main_by_date(cursor, connection, "hour_wise_sales", "hour_wise_sales_stage", brand_name)
+        cursor.execute("START TRANSACTION")
+        try:
+            cursor.execute(delete_sql, params + (min_date, max_date))
+            cursor.execute(sql, params)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
 
 
 def update_overall_summary_incremental(cursor, connection, brand_key: Optional[str], brand_name: str, min_date: str, max_date: str):
     """Update overall_summary for affected date range only (with partial payments + adjusted sessions).
-    Refactored to use STAGING table for chunked merge.
+    Rows are upserted on the primary key in a single statement.
     """
     with timed(f"[{brand_name}] overall_summary incremental ({min_date} to {max_date})"):
-        # STEP 1: Create staging table
-        cursor.execute("CREATE TABLE IF NOT EXISTS overall_summary_stage LIKE overall_summary")
-        # STEP 2: Clear staging table
-        cursor.execute("TRUNCATE TABLE overall_summary_stage")
-
-        # STEP 3: Populate staging table
+        # Recompute the affected days and upsert them in place on the primary key
         sql = """
-        INSERT INTO overall_summary_stage (
+        INSERT INTO overall_summary (
             date, gross_sales, total_discount_amount, total_sales, net_sales,
             total_orders, cod_orders, prepaid_orders, partially_paid_orders,
             total_sessions, total_atc_sessions, adjusted_total_sessions
@@ -2246,18 +3008,28 @@ def update_overall_summary_incremental(cursor, connection, brand_key: Optional[s
         LEFT JOIN gross_summary      gs   ON s.date = gs.date
         LEFT JOIN discount_summary   ds   ON s.date = ds.date
         WHERE s.date BETWEEN %s AND %s
+        ON DUPLICATE KEY UPDATE
+            gross_sales = VALUES(gross_sales),
+            total_discount_amount = VALUES(total_discount_amount),
+            total_sales = VALUES(total_sales),
+            net_sales = VALUES(net_sales),
+            total_orders = VALUES(total_orders),
+            cod_orders = VALUES(cod_orders),
+            prepaid_orders = VALUES(prepaid_orders),
+            partially_paid_orders = VALUES(partially_paid_orders),
+            total_sessions = VALUES(total_sessions),
+            total_atc_sessions = VALUES(total_atc_sessions),
+            adjusted_total_sessions = VALUES(adjusted_total_sessions)
         """
         cursor.execute(sql, (brand_key, min_date, max_date))
         connection.commit()
 
-        # STEP 4 & 5: Fetch affected dates and merge
-        merge_staging_to_main_by_date(cursor, connection, "overall_summary", "overall_summary_stage", brand_name)
 
-
-def update_shopify_orders_utm_daily_incremental(cursor, connection, brand_name: str, min_date: str, max_date: str):
+def update_shopify_orders_utm_daily_incremental(cursor, connection, brand_name: str, min_date: str, max_date: str,
+                                                orders_table: str = "shopify_orders"):
     """Update shopify_orders_utm_daily for affected date range only."""
     with timed(f"[{brand_name}] shopify_orders_utm_daily incremental ({min_date} to {max_date})"):
-        sql = """
+        sql = f"""
         INSERT INTO shopify_orders_utm_daily (
             date, utm_source, utm_medium, utm_campaign, utm_content, utm_term,
             total_orders, total_sales, total_discounts, shipping_total, tax_total, net_sales, aov,
@@ -2278,7 +3050,7 @@ def update_shopify_orders_utm_daily_incremental(cursor, connection, brand_name:
                 SUM(total_tax) AS tax_total,
                 0 AS number_of_sessions,
                 0 AS number_of_atc_sessions
-            FROM shopify_orders
+            FROM {orders_table}
             WHERE DATE(created_at) BETWEEN %s AND %s
             GROUP BY 1, 2, 3, 4, 5, 6
         ),
@@ -2484,35 +3256,83 @@ def push_overall_summary_events_to_qstash(
 
 def execute_summary_queries_incremental(brand_index: int, brand_name: str,
                                        brand_key: Optional[str],
-                                       min_date: Optional[str], max_date: Optional[str]):
+                                       affected_dates: Set[str]):
     """
     INCREMENTAL summary updates - Only recalculate affected dates.
     This is the KEY OPTIMIZATION that reduces processing time by 90%+.
 
+    sales_summary is refreshed for the exact `affected_dates`; the remaining
+    summaries still rebuild the contiguous [min, max] window.
+
     NEW: After updating summaries, publish overall_summary events via QStash for alerts.
     """
-    if not min_date or not max_date:
+    if not affected_dates:
         logger.info(f"✔️ No date range to update for {brand_name}")
         return
-    
+
+    min_date, max_date = min(affected_dates), max(affected_dates)
+    windows_locked = False
+
     try:
         with get_db_cursor(brand_index, dictionary=False) as (cursor, connection):
             cursor.execute("SET SESSION autocommit=1")
-            logger.info(f"📊 Updating summaries for {brand_name}: {min_date} to {max_date}")
-            
-            # Ensure all tables exist
-            ensure_summary_tables(cursor, connection)
-            
-            # Update each summary incrementally
-            update_sales_summary_incremental(cursor, connection, brand_name, min_date, max_date)
-            update_order_summary_incremental(cursor, connection, brand_name, min_date, max_date)
-            update_discount_summary_incremental(cursor, connection, brand_name, min_date, max_date)
-            update_gross_summary_incremental(cursor, connection, brand_name, min_date, max_date)
-            update_hour_wise_sales_incremental(cursor, connection, brand_name, min_date, max_date)
-            update_overall_summary_incremental(cursor, connection, brand_key, brand_name, min_date, max_date)
-            update_shopify_orders_utm_daily_incremental(cursor, connection, brand_name, min_date, max_date)
-            
-            logger.info(f"✅ Incremental summaries updated for {brand_name} ({min_date} to {max_date})")
+            try:
+                logger.info(f"📊 Updating summaries for {brand_name}: {min_date} to {max_date}")
+
+                # Ensure all tables exist
+                ensure_summary_tables(cursor, connection)
+
+                orders_src, updates_src = "shopify_orders", "shopify_orders_update"
+                if USE_SUMMARY_WINDOWS:
+                    try:
+                        windows_locked = acquire_summary_windows(cursor)
+                        if windows_locked:
+                            ensure_summary_windows(cursor, brand_index)
+                            materialize_summary_windows(cursor, connection, brand_name, min_date, max_date)
+                            orders_src, updates_src = SUMMARY_ORDERS_WINDOW, SUMMARY_UPDATES_WINDOW
+                        else:
+                            logger.info(f"ℹ️ [{brand_name}] Summary windows in use by another refresh; reading base tables")
+                    except mysql.connector.Error as e:
+                        logger.warning(f"⚠️ [{brand_name}] Summary windows unavailable, reading base tables: {e}")
+                if orders_src == "shopify_orders":
+                    prewarm_summary_sources(cursor, brand_name, min_date, max_date)
+
+                # Summaries that only read the orders/returns sources can run side by side
+                independent = [
+                    (update_sales_summary_incremental, (brand_name, affected_dates, orders_src, updates_src)),
+                    (update_order_summary_incremental, (brand_name, min_date, max_date, orders_src, updates_src)),
+                    (update_discount_summary_incremental, (brand_name, min_date, max_date, orders_src, updates_src)),
+                    (update_hour_wise_sales_incremental, (brand_name, min_date, max_date, orders_src)),
+                    (update_shopify_orders_utm_daily_incremental, (brand_name, min_date, max_date, orders_src)),
+                ]
+                if SUMMARY_PARALLEL_WORKERS > 1:
+                    with ThreadPoolExecutor(max_workers=min(SUMMARY_PARALLEL_WORKERS, len(independent)),
+                                            thread_name_prefix=f"summary-{brand_index}") as pool:
+                        futures = [pool.submit(_run_summary_job, brand_index, job, *args)
+                                   for job, args in independent]
+                        for future in futures:
+                            future.result()
+                else:
+                    for job, args in independent:
+                        job(cursor, connection, *args)
+
+                # gross reads discount_summary; overall reads all of the above
+                update_gross_summary_incremental(cursor, connection, brand_name, min_date, max_date, orders_src)
+                update_overall_summary_incremental(cursor, connection, brand_key, brand_name, min_date, max_date)
+
+                logger.info(f"✅ Incremental summaries updated for {brand_name} ({min_date} to {max_date})")
+            finally:
+                # Held until every summary job (including the parallel ones) has finished reading
+                if windows_locked:
+                    try:
+                        release_summary_windows(cursor)
+                    except Exception as e:
+                        logger.warning(f"⚠️ [{brand_name}] Could not release the summary window lock: {e}")
+                # Pooled sessions are not reset on checkout; restore the driver default
+                try:
+                    cursor.execute("SET SESSION autocommit=0")
+                except Exception:
+                    pass
 
         # Now that overall_summary is updated, publish events via QStash
         try:
@@ -2529,8 +3349,7 @@ def execute_summary_queries_incremental(brand_index: int, brand_name: str,
             )
 
     except Exception as e:
-        logger.error(f"❌ Error executing incremental summaries for {brand_name}: {e}")
-        traceback.print_exc()
+        logger.exception(f"❌ Error executing incremental summaries for {brand_name}: {e}")
 
 
 # ---------------------------
@@ -2700,7 +3519,7 @@ def fetch_shopify_sessions_via_shopifyql(
         for attempt in range(1, 4):  # up to 3 tries
             try:
                 with timed(f"ShopifyQL fetch (sessions DURING today) [attempt {attempt}/3]"):
-                    resp = session.post(url, headers=headers, data=json.dumps(payload), timeout=60)
+                    resp = session.post(url, headers=headers, data=_json_dumps_body(payload), timeout=60)
                 last_exc = None
                 break  # success
             except Exception as e:
@@ -2726,7 +3545,7 @@ def fetch_shopify_sessions_via_shopifyql(
             )
             return 0, 0
 
-        body = resp.json()
+        body = _json_loads(resp.content)
 
         # Top-level GraphQL errors
         if body.get("errors"):
@@ -2767,8 +3586,7 @@ def fetch_shopify_sessions_via_shopifyql(
         return results
 
     except Exception as e:
-        logger.error(f"❌ Exception while calling ShopifyQL sessions: {e}")
-        traceback.print_exc()
+        logger.exception(f"❌ Exception while calling ShopifyQL sessions: {e}")
         return []
     finally:
         try:
@@ -2843,7 +3661,7 @@ def fetch_shopify_hourly_sessions_via_shopifyql(
         for attempt in range(1, 4):
             try:
                 with timed(f"ShopifyQL hourly fetch ({date_clause}) [attempt {attempt}/3]"):
-                    resp = session.post(url, headers=headers, data=json.dumps(payload), timeout=60)
+                    resp = session.post(url, headers=headers, data=_json_dumps_body(payload), timeout=60)
                 break
             except Exception as e:
                 logger.warning(f"⚠️ Attempt {attempt}/3 failed: {e}")
@@ -2856,7 +3674,7 @@ def fetch_shopify_hourly_sessions_via_shopifyql(
             logger.error(f"❌ ShopifyQL hourly failed: {resp.status_code if resp else 'No response'}")
             return []
 
-        body = resp.json()
+        body = _json_loads(resp.content)
         if body.get("errors"):
             logger.error(f"❌ GraphQL errors: {json.dumps(body['errors'])}")
             return []
@@ -2935,18 +3753,9 @@ def fetch_shopify_hourly_sessions_via_shopifyql(
             pass
 
 
-def update_hourly_sessions_summary_from_shopifyql(
-    brand_index: int,
-    brand_name: str,
-    shop_name: str,
-    api_version: str,
-    access_token: str,
-    cursor=None,
-    connection=None
-):
-    """
-    Update hourly_sessions_summary_shopify from ShopifyQL.
-    """
+def fetch_hourly_sessions_window(brand_index: int, shop_name: str, api_version: str,
+                                 access_token: str) -> List[Dict[str, Any]]:
+    """Fetch the hourly ShopifyQL rows for yesterday..today (or the backfill window). No DB access."""
     today_dt = now_ist().date()
     start_dt = today_dt - timedelta(days=1)
     end_dt = today_dt
@@ -2955,7 +3764,7 @@ def update_hourly_sessions_summary_from_shopifyql(
         start_dt = BACKFILL_START_IST.date()
         end_dt = BACKFILL_END_IST.date()
 
-    results = fetch_shopify_hourly_sessions_via_shopifyql(
+    return fetch_shopify_hourly_sessions_via_shopifyql(
         shop_name=shop_name,
         api_version=api_version,
         access_token=access_token,
@@ -2963,6 +3772,24 @@ def update_hourly_sessions_summary_from_shopifyql(
         end_date=end_dt.isoformat(),
     )
 
+
+def update_hourly_sessions_summary_from_shopifyql(
+    brand_index: int,
+    brand_name: str,
+    shop_name: str,
+    api_version: str,
+    access_token: str,
+    cursor=None,
+    connection=None,
+    results: Optional[List[Dict[str, Any]]] = None,
+):
+    """
+    Update hourly_sessions_summary_shopify from ShopifyQL.
+    Pass `results` to upsert rows already fetched via fetch_hourly_sessions_window.
+    """
+    if results is None:
+        results = fetch_hourly_sessions_window(brand_index, shop_name, api_version, access_token)
+
     if not results:
         return
 
@@ -2976,43 +3803,23 @@ def update_hourly_sessions_summary_from_shopifyql(
             logger.error(f"❌ Error updating hourly Shopify sessions for {brand_name}: {e}")
 
 def _do_upsert_hourly_sessions_shopify(results, cursor, connection, brand_name):
+    # Shopify truth goes to hourly_sessions_summary_shopify and is mirrored into the
+    # total/device columns of hourly_sessions_summary (internal telemetry)
+    rows = []
     for r in results:
-        # 1. Update hourly_sessions_summary_shopify (Shopify Truth)
-        # We also update the main number_of_sessions/atc columns as they represent the shopify truth
         total_sessions = r["mobile_sessions"] + r["desktop_sessions"] + r["tablet_sessions"] + r["other_sessions"]
         total_atc = r["mobile_atc_sessions"] + r["desktop_atc_sessions"] + r["tablet_atc_sessions"] + r["other_atc_sessions"]
-
-        cursor.execute("""
-            INSERT INTO hourly_sessions_summary_shopify 
-            (date, hour, 
-             number_of_sessions, number_of_atc_sessions,
-             mobile_sessions, mobile_atc_sessions,
-             desktop_sessions, desktop_atc_sessions,
-             tablet_sessions, tablet_atc_sessions,
-             other_sessions, other_atc_sessions)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-                number_of_sessions = VALUES(number_of_sessions),
-                number_of_atc_sessions = VALUES(number_of_atc_sessions),
-                mobile_sessions = VALUES(mobile_sessions),
-                mobile_atc_sessions = VALUES(mobile_atc_sessions),
-                desktop_sessions = VALUES(desktop_sessions),
-                desktop_atc_sessions = VALUES(desktop_atc_sessions),
-                tablet_sessions = VALUES(tablet_sessions),
-                tablet_atc_sessions = VALUES(tablet_atc_sessions),
-                other_sessions = VALUES(other_sessions),
-                other_atc_sessions = VALUES(other_atc_sessions);
-        """, (r["date"], r["hour"], total_sessions, total_atc,
-              r["mobile_sessions"], r["mobile_atc_sessions"],
-              r["desktop_sessions"], r["desktop_atc_sessions"],
-              r["tablet_sessions"], r["tablet_atc_sessions"],
-              r["other_sessions"], r["other_atc_sessions"]))
-
-        # 2. Update hourly_sessions_summary (Internal Telemetry)
-        # We also update the total columns here to keep them in sync with Shopify truth
-        cursor.execute("""
-            INSERT INTO hourly_sessions_summary 
-            (date, hour, 
+        rows.append((r["date"], r["hour"], total_sessions, total_atc,
+                     r["mobile_sessions"], r["mobile_atc_sessions"],
+                     r["desktop_sessions"], r["desktop_atc_sessions"],
+                     r["tablet_sessions"], r["tablet_atc_sessions"],
+                     r["other_sessions"], r["other_atc_sessions"]))
+
+    # One executemany per table; mysql-connector rewrites it into a single multi-row INSERT
+    for table in ("hourly_sessions_summary_shopify", "hourly_sessions_summary"):
+        cursor.executemany(f"""
+            INSERT INTO {table}
+            (date, hour,
              number_of_sessions, number_of_atc_sessions,
              mobile_sessions, mobile_atc_sessions,
              desktop_sessions, desktop_atc_sessions,
@@ -3029,13 +3836,9 @@ def _do_upsert_hourly_sessions_shopify(results, cursor, connection, brand_name):
                 tablet_sessions = VALUES(tablet_sessions),
                 tablet_atc_sessions = VALUES(tablet_atc_sessions),
                 other_sessions = VALUES(other_sessions),
-                other_atc_sessions = VALUES(other_atc_sessions);
-        """, (r["date"], r["hour"], total_sessions, total_atc,
-              r["mobile_sessions"], r["mobile_atc_sessions"],
-              r["desktop_sessions"], r["desktop_atc_sessions"],
-              r["tablet_sessions"], r["tablet_atc_sessions"],
-              r["other_sessions"], r["other_atc_sessions"]))
-    
+                other_atc_sessions = VALUES(other_atc_sessions)
+        """, rows)
+
     connection.commit()
     logger.info(f"✅ ShopifyQL hourly sessions and device breakdown updated for {brand_name} ({len(results)} rows)")
 
@@ -3104,32 +3907,34 @@ def update_sessions_summary_from_shopifyql(
 
     if cursor is not None:
         # Reusing existing connection
-        _do_upsert_sessions_from_shopifyql(results, cursor, connection, brand_name)
+        _do_upsert_sessions_from_shopifyql(results, cursor, connection, brand_name,
+                                           ensure_table=brand_index not in _session_tables_ensured)
     else:
         # Create new connection
         try:
             with get_db_cursor(brand_index) as (c, conn):
-                _do_upsert_sessions_from_shopifyql(results, c, conn, brand_name)
+                _do_upsert_sessions_from_shopifyql(results, c, conn, brand_name,
+                                                   ensure_table=brand_index not in _session_tables_ensured)
         except Exception as e:
             logger.error(f"❌ Error updating sessions summary for {brand_name}: {e}")
 
-def _do_upsert_sessions_from_shopifyql(results, cursor, connection, brand_name):
-    # Ensure table exists
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS sessions_summary (
-            date DATE PRIMARY KEY,
-            number_of_sessions INT DEFAULT 0,
-            number_of_atc_sessions INT DEFAULT 0
-        );
-    """)
-    for r in results:
+def _do_upsert_sessions_from_shopifyql(results, cursor, connection, brand_name, ensure_table: bool = True):
+    # Ensure table exists (already done by update_sessions_summary when it ran for this brand)
+    if ensure_table:
         cursor.execute("""
-            INSERT INTO sessions_summary (date, number_of_sessions, number_of_atc_sessions)
-            VALUES (%s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-                number_of_sessions = VALUES(number_of_sessions),
-                number_of_atc_sessions = VALUES(number_of_atc_sessions);
-        """, (r["date"], r["sessions"], r["atc_sessions"]))
+            CREATE TABLE IF NOT EXISTS sessions_summary (
+                date DATE PRIMARY KEY,
+                number_of_sessions INT DEFAULT 0,
+                number_of_atc_sessions INT DEFAULT 0
+            );
+        """)
+    cursor.executemany("""
+        INSERT INTO sessions_summary (date, number_of_sessions, number_of_atc_sessions)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            number_of_sessions = VALUES(number_of_sessions),
+            number_of_atc_sessions = VALUES(number_of_atc_sessions)
+    """, [(r["date"], r["sessions"], r["atc_sessions"]) for r in results])
     connection.commit()
     logger.info(f"✅ ShopifyQL daily sessions updated for {brand_name} ({len(results)} rows)")
 
@@ -3175,9 +3980,9 @@ def fetch_shopify_utm_sessions_daily(
     
     session = _make_shopifyql_session()
     try:
-        resp = session.post(url, headers=headers, data=json.dumps(payload), timeout=60)
+        resp = session.post(url, headers=headers, data=_json_dumps_body(payload), timeout=60)
         if resp.status_code != 200: return []
-        body = resp.json()
+        body = _json_loads(resp.content)
         table_data = body.get("data", {}).get("shopifyqlQuery", {}).get("tableData")
         return _format_shopifyql_table(table_data)
     except:
@@ -3327,9 +4132,9 @@ def fetch_shopify_referrer_sessions_daily(
     
     session = _make_shopifyql_session()
     try:
-        resp = session.post(url, headers=headers, data=json.dumps(payload), timeout=60)
+        resp = session.post(url, headers=headers, data=_json_dumps_body(payload), timeout=60)
         if resp.status_code != 200: return []
-        body = resp.json()
+        body = _json_loads(resp.content)
         table_data = body.get("data", {}).get("shopifyqlQuery", {}).get("tableData")
         return _format_shopifyql_table(table_data)
     except:
@@ -3442,6 +4247,10 @@ def process_and_upload_referrer_summary(
 # ---------------------------
 # Sessions summary (logic preserved)
 # ---------------------------
+# brand_index values whose session/metadata tables have been created in this process
+_session_tables_ensured: Set[int] = set()
+
+
 def update_sessions_summary(brand_index: int, brand_name: str, session_url: str,
                             x_brand_name: str, x_api_key: str,
                             shop_name: str, api_version: str, access_token: str):
@@ -3452,41 +4261,49 @@ def update_sessions_summary(brand_index: int, brand_name: str, session_url: str,
     """
     try:
         with get_db_cursor(brand_index) as (cursor, connection):
-            with timed("Ensure session tables"):
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS sessions_summary (
-                        date DATE PRIMARY KEY,
-                        number_of_sessions INT DEFAULT 0,
-                        number_of_atc_sessions INT DEFAULT 0
-                    );
-                """)
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS hourly_sessions_summary (
-                        date DATE NOT NULL,
-                        hour TINYINT UNSIGNED NOT NULL,
-                        number_of_sessions INT DEFAULT 0,
-                        number_of_atc_sessions INT DEFAULT 0,
-                        PRIMARY KEY (date, hour)
-                    );
-                """)
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS pipeline_metadata (
-                        key_name VARCHAR(50) PRIMARY KEY,
-                        key_value DATETIME
-                    );
-                """)
-                connection.commit()
+            if brand_index not in _session_tables_ensured:
+                with timed("Ensure session tables"):
+                    cursor.execute("""
+                        CREATE TABLE IF NOT EXISTS sessions_summary (
+                            date DATE PRIMARY KEY,
+                            number_of_sessions INT DEFAULT 0,
+                            number_of_atc_sessions INT DEFAULT 0
+                        );
+                    """)
+                    cursor.execute("""
+                        CREATE TABLE IF NOT EXISTS hourly_sessions_summary (
+                            date DATE NOT NULL,
+                            hour TINYINT UNSIGNED NOT NULL,
+                            number_of_sessions INT DEFAULT 0,
+                            number_of_atc_sessions INT DEFAULT 0,
+                            PRIMARY KEY (date, hour)
+                        );
+                    """)
+                    cursor.execute("""
+                        CREATE TABLE IF NOT EXISTS pipeline_metadata (
+                            key_name VARCHAR(50) PRIMARY KEY,
+                            key_value DATETIME
+                        );
+                    """)
+                    connection.commit()
+                _session_tables_ensured.add(brand_index)
 
             # --- DAILY & HOURLY: Use ShopifyQL as source of truth ---
-            update_sessions_summary_from_shopifyql(
-                brand_index=brand_index,
-                brand_name=brand_name,
-                shop_name=shop_name,
-                api_version=api_version,
-                access_token=access_token,
-                cursor=cursor,
-                connection=connection
-            )
+            # The hourly query needs no DB state, so it runs while the daily one fetches and upserts
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"sessions-{brand_index}") as pool:
+                hourly_future = pool.submit(
+                    fetch_hourly_sessions_window, brand_index, shop_name, api_version, access_token
+                )
+                update_sessions_summary_from_shopifyql(
+                    brand_index=brand_index,
+                    brand_name=brand_name,
+                    shop_name=shop_name,
+                    api_version=api_version,
+                    access_token=access_token,
+                    cursor=cursor,
+                    connection=connection
+                )
+                hourly_results = hourly_future.result()
 
             update_hourly_sessions_summary_from_shopifyql(
                 brand_index=brand_index,
@@ -3495,7 +4312,8 @@ def update_sessions_summary(brand_index: int, brand_name: str, session_url: str,
                 api_version=api_version,
                 access_token=access_token,
                 cursor=cursor,
-                connection=connection
+                connection=connection,
+                results=hourly_results,
             )
 
             update_last_fetch_timestamp(cursor, connection, now_ist())
@@ -3506,39 +4324,41 @@ def update_sessions_summary(brand_index: int, brand_name: str, session_url: str,
             update_hour_wise_sales_incremental(cursor, connection, brand_name, today_str, today_str)
 
     except Exception as e:
-        logger.error(f"❌ Error updating sessions for {brand_name}: {e}")
-        traceback.print_exc()
+        logger.exception(f"❌ Error updating sessions for {brand_name}: {e}")
 
 
 
 # ---------------------------
 # Per-brand processing
 # ---------------------------
-def process_single_brand(brand_index: int):
-    if brand_index not in db_connection_pools:
-        logger.error(f"❌ Skipping brand {brand_index}: no connection pool")
-        return
-    brand_name = os.environ.get(f"BRAND_NAME_{brand_index}", f"Brand_{brand_index}")
-    brand_key  = os.environ.get(f"BRAND_TAG_{brand_index}")  # used for session_adjustment_buckets & alerts
+@dataclass(frozen=True)
+class BrandConfig:
+    """Per-brand settings from the environment; fixed once initialize_brand_configs has run."""
+    brand_name: str
+    brand_key: Optional[str]
+    shop_name: Optional[str]
+    api_version: Optional[str]
+    access_token: Optional[str]
+    session_url: str
+    api_base_url: str
+    app_id_mapping: Dict[str, Any]
 
-    logger.info(f"\n{'='*50}\nSTARTING PROCESS FOR SHOP: {brand_name}\n{'='*50}")
 
+brand_configs: Dict[int, BrandConfig] = {}
+
+
+def load_brand_config(brand_index: int) -> BrandConfig:
+    """Read BRAND_*/SHOP_*/APP_ID_MAPPING_{brand_index} once and keep the result in brand_configs."""
+    brand_name = os.environ.get(f"BRAND_NAME_{brand_index}", f"Brand_{brand_index}")
     shop_name = os.environ.get(f"SHOP_NAME_{brand_index}")
     api_version = os.environ.get(f"API_VERSION_{brand_index}")
-    access_token = os.environ.get(f"ACCESS_TOKEN_{brand_index}")
-    session_url = os.environ.get(f"SESSION_URL_{brand_index}", "")
-    x_brand_name = ""
-    x_api_key = ""
-    api_base_url = f"https://{shop_name}.myshopify.com/admin/api/{api_version}"
 
-    # mapping
     app_id_mapping_str = os.environ.get(f"APP_ID_MAPPING_{brand_index}", "{}")
     try:
         app_id_mapping = json.loads(app_id_mapping_str)
     except json.JSONDecodeError:
         logger.warning(f"⚠️ Invalid JSON in APP_ID_MAPPING_{brand_index} for {brand_name}. Using empty mapping.")
         app_id_mapping = {}
-    # >>> Add these logs right here <<<
     logger.info(
         f"APP_ID_MAPPING_{brand_index} for {brand_name}: "
         f"{'EMPTY' if not app_id_mapping else list(app_id_mapping.keys())}"
@@ -3546,9 +4366,57 @@ def process_single_brand(brand_index: int):
     # Optional: also log a short hash/length to catch truncation/mis-set envs
     logger.info(f"APP_ID_MAPPING_{brand_index} length={len(app_id_mapping_str)}")
 
+    cfg = BrandConfig(
+        brand_name=brand_name,
+        brand_key=os.environ.get(f"BRAND_TAG_{brand_index}"),
+        shop_name=shop_name,
+        api_version=api_version,
+        access_token=os.environ.get(f"ACCESS_TOKEN_{brand_index}"),
+        session_url=os.environ.get(f"SESSION_URL_{brand_index}", ""),
+        api_base_url=f"https://{shop_name}.myshopify.com/admin/api/{api_version}",
+        app_id_mapping=app_id_mapping,
+    )
+    brand_configs[brand_index] = cfg
+    return cfg
+
+
+def process_single_brand(brand_index: int):
+    if brand_index not in db_connection_pools:
+        logger.error(f"❌ Skipping brand {brand_index}: no connection pool")
+        return
+    # Built once at startup by initialize_brand_configs
+    cfg = brand_configs.get(brand_index) or load_brand_config(brand_index)
+    brand_name = cfg.brand_name
+    brand_key = cfg.brand_key  # used for session_adjustment_buckets & alerts
+
+    logger.info(f"\n{'='*50}\nSTARTING PROCESS FOR SHOP: {brand_name}\n{'='*50}")
+
+    shop_name = cfg.shop_name
+    api_version = cfg.api_version
+    access_token = cfg.access_token
+    session_url = cfg.session_url
+    x_brand_name = ""
+    x_api_key = ""
+    api_base_url = cfg.api_base_url
+    app_id_mapping = cfg.app_id_mapping
+
+    # One clock read per cycle: both order windows end at the same instant
+    cycle_now = now_ist()
+    cycle_end_date = convert_to_desired_format(cycle_now)
+    cycle_today = cycle_now.date().isoformat()
+
     # --- Pre-flight Schema Migration (Avoid Locks) ---
     ensure_user_agent_column(brand_index, 'shopify_orders')
     ensure_user_agent_column(brand_index, 'shopify_orders_update')
+    # Every summary query reads these columns; stop before fetching so no affected dates are lost
+    if not all([
+        ensure_summary_key_columns(brand_index, 'shopify_orders'),
+        ensure_summary_key_columns(brand_index, 'shopify_orders_update'),
+    ]):
+        logger.error(f"❌ Skipping {brand_name} this cycle: summary key columns could not be added")
+        return
+    ensure_order_table_partitions(brand_index, 'shopify_orders')
+    ensure_order_table_partitions(brand_index, 'shopify_orders_update')
     ensure_device_summary_columns(brand_index, 'hourly_sessions_summary')
     ensure_device_summary_columns(brand_index, 'hourly_sessions_summary_shopify')
     ensure_utm_names_column(brand_index, 'overall_utm_summary')
@@ -3557,7 +4425,7 @@ def process_single_brand(brand_index: int):
     update_sessions_summary(brand_index, brand_name, session_url, x_brand_name, x_api_key, shop_name, api_version, access_token)
 
     # Track affected dates across all order processing
-    affected_dates = {'min': None, 'max': None}
+    affected_dates: Set[str] = set()
     
     # Orders (NEW + UPDATED) with single connection/cursor reused
     process_types = [
@@ -3566,10 +4434,12 @@ def process_single_brand(brand_index: int):
     ]
 
     with get_db_cursor(brand_index) as (cursor, connection):
+        # Work out both fetch windows first so the NEW and UPDATED fetches can run concurrently
+        planned = []
         for process in process_types:
-            logger.info(f"\n--- Processing {process['type']} orders for {brand_name} ---")
             timestamp_col = 'created_at' if process['type'] == 'NEW' else 'updated_at'
-            last_order = get_last_order(brand_index, process['table'], cursor=cursor)
+            last_orders = get_last_orders(brand_index, process['table'], cursor=cursor)
+            last_order = last_orders[0] if last_orders else None
             existing_ids = set()
 
             if is_backfill_active_for(brand_index):
@@ -3587,95 +4457,106 @@ def process_single_brand(brand_index: int):
                 # Add 1 second to avoid re-fetching the last order (API is inclusive)
                 next_ts = last_ts + timedelta(seconds=1)
                 start_date = convert_to_desired_format(next_ts)
-                end_date = convert_to_desired_format(now_ist())
-                logger.info(f"Fetching orders after: {last_ts} (API start: {next_ts})")
+                end_date = cycle_end_date
+                logger.info(f"{process['type']}: fetching orders after: {last_ts} (API start: {next_ts})")
                 
                 # Still check for duplicates at last_ts in case of sub-second precision loss
                 # (Shopify API has millisecond precision, MySQL DATETIME is second precision)
-                existing_ids = get_orders_with_same_timestamp(
-                    brand_index, process['table'], last_ts, timestamp_field=timestamp_col, cursor=cursor
-                )
+                existing_ids = {row['order_id'] for row in last_orders}
                 if existing_ids:
                     logger.info(f"Found {len(existing_ids)} existing orders at {last_ts} (will filter duplicates)")
 
-            orders_list = fetch_orders(api_base_url, access_token, start_date, end_date, process['date_field'])
+            planned.append((process, existing_ids, (start_date, end_date)))
 
-            if not orders_list:
-                logger.info(f"No new {process['type']} orders to process for {brand_name}")
-                continue
+        # Fetch concurrently; DB writes below stay serialized on this cursor, NEW before UPDATED
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix=f"orders-{brand_index}") as fetch_pool:
+            fetches = [
+                fetch_pool.submit(fetch_orders, api_base_url, access_token, start_date, end_date,
+                                  process['date_field'])
+                for process, _, (start_date, end_date) in planned
+            ]
 
-            original_count = len(orders_list)
-            filtered = [o for o in orders_list if str(o.get('id')) not in existing_ids] if existing_ids else orders_list
-            if not filtered:
-                logger.info(f"Fetched {original_count} orders, all duplicates. Nothing to insert.")
-                continue
+            for (process, existing_ids, _), fetch in zip(planned, fetches):
+                logger.info(f"\n--- Processing {process['type']} orders for {brand_name} ---")
+                orders_list = fetch.result()
 
-            logger.info(f"Fetched {original_count}, removed {original_count - len(filtered)} duplicates. Processing {len(filtered)} orders.")
+                if not orders_list:
+                    logger.info(f"No new {process['type']} orders to process for {brand_name}")
+                    continue
 
-            # Track affected date range for NEW orders before load
-            if process['type'] == 'NEW':
-                min_d, max_d = get_affected_date_range_new_orders(filtered)
-                if min_d:
-                    affected_dates['min'] = min(affected_dates['min'] or min_d, min_d)
-                    affected_dates['max'] = max(affected_dates['max'] or max_d, max_d)
-                    logger.info(
-                        f"📅 Affected date range for {process['type']}: {min_d} to {max_d}"
-                    )
-            
-            df = transform_orders_to_df_optimized(filtered, app_id_mapping)
+                original_count = len(orders_list)
+                filtered = [o for o in orders_list if str(o.get('id')) not in existing_ids] if existing_ids else orders_list
+                if not filtered:
+                    logger.info(f"Fetched {original_count} orders, all duplicates. Nothing to insert.")
+                    continue
 
-            # Load immediately for this process type
-            batch_size = int(os.environ.get('BATCH_SIZE', 1000))
-            load_data_to_sql_optimized(df, brand_index, brand_name, process['table'], batch_size)
+                logger.info(f"Fetched {original_count}, removed {original_count - len(filtered)} duplicates. Processing {len(filtered)} orders.")
 
-            # Upsert returns_fact from the same filtered snapshots
-            changed_return_dates = upsert_returns_fact_from_orders(
-                brand_index, filtered, cursor=cursor, connection=connection
-            )
+                df = transform_orders(filtered, app_id_mapping)
+
+                # Track affected date range for NEW orders before load
+                if process['type'] == 'NEW':
+                    new_dates = get_affected_date_range_new_orders(df)
+                    if new_dates:
+                        affected_dates |= new_dates
+                        logger.info(
+                            f"📅 Affected dates for {process['type']}: {len(new_dates)} "
+                            f"({min(new_dates)} to {max(new_dates)})"
+                        )
+
+                # Load immediately for this process type
+                batch_size = int(os.environ.get('BATCH_SIZE', 5000))
+                load_data_to_sql_optimized(df, brand_index, brand_name, process['table'], batch_size)
 
-            # UPDATED orders: build affected range from updated_at + returns_fact deltas.
-            if process['type'] == 'UPDATED':
-                min_d, max_d = get_affected_date_range_updates(
-                    filtered,
-                    extra_event_dates=changed_return_dates,
+                # Upsert returns_fact from the same filtered snapshots
+                changed_return_dates = upsert_returns_fact_from_orders(
+                    brand_index, filtered, cursor=cursor, connection=connection
                 )
-                if min_d:
-                    affected_dates['min'] = min(affected_dates['min'] or min_d, min_d)
-                    affected_dates['max'] = max(affected_dates['max'] or max_d, max_d)
-                    logger.info(
-                        f"📅 Affected date range for {process['type']}: {min_d} to {max_d}"
+
+                # UPDATED orders: build affected range from updated_at + returns_fact deltas.
+                if process['type'] == 'UPDATED':
+                    update_dates = get_affected_date_range_updates(
+                        filtered,
+                        extra_event_dates=changed_return_dates,
                     )
-                else:
-                    logger.info("✔️ UPDATED orders produced no new/changed affected dates")
+                    if update_dates:
+                        affected_dates |= update_dates
+                        logger.info(
+                            f"📅 Affected dates for {process['type']}: {len(update_dates)} "
+                            f"({min(update_dates)} to {max(update_dates)})"
+                        )
+                    else:
+                        logger.info("✔️ UPDATED orders produced no new/changed affected dates")
 
-    # Record completion
-    with timed("Record pipeline completion timestamp"):
-        with get_db_cursor(brand_index) as (cursor, connection):
+        # Record completion on the orders connection rather than checking out another one
+        with timed("Record pipeline completion timestamp"):
             cursor.execute("""
                 INSERT INTO pipeline_metadata (key_name, key_value)
                 VALUES ('last_pipeline_completion_time', %s)
                 ON DUPLICATE KEY UPDATE key_value = VALUES(key_value);
             """, (now_ist(),))
             connection.commit()
-            logger.info(f"✅ Recorded pipeline completion for {brand_name}")
+        logger.info(f"✅ Recorded pipeline completion for {brand_name}")
 
     # Summaries (INCREMENTAL - only affected dates)
-    if affected_dates['min'] and affected_dates['max']:
-        logger.info(f"\n--- Updating summaries for {brand_name} (INCREMENTAL: {affected_dates['min']} to {affected_dates['max']}) ---")
+    if affected_dates:
+        logger.info(
+            f"\n--- Updating summaries for {brand_name} (INCREMENTAL: {len(affected_dates)} dates, "
+            f"{min(affected_dates)} to {max(affected_dates)}) ---"
+        )
         execute_summary_queries_incremental(
             brand_index,
             brand_name,
             brand_key,
-            affected_dates['min'],
-            affected_dates['max'],
+            affected_dates,
         )
     else:
         logger.info(f"✔️ No order-based summary updates needed for {brand_name} (no affected dates)")
 
     # --- ShopifyQL Summaries (Always updated for 'today' or affected range) ---
     try:
-        u_min = affected_dates['min'] or now_ist().date().isoformat()
-        u_max = affected_dates['max'] or now_ist().date().isoformat()
+        u_min = min(affected_dates) if affected_dates else cycle_today
+        u_max = max(affected_dates) if affected_dates else cycle_today
         
         if is_backfill_active_for(brand_index) and BACKFILL_START_IST and BACKFILL_END_IST:
              u_min = BACKFILL_START_IST.date().isoformat()
@@ -3702,8 +4583,7 @@ def process_single_brand(brand_index: int):
             logger.error(f"❌ Error updating Referrer summary for {brand_name}: {e}")
 
     except Exception as e:
-        logger.error(f"❌ Critical error in ShopifyQL summary block for {brand_name}: {e}")
-        traceback.print_exc()
+        logger.exception(f"❌ Critical error in ShopifyQL summary block for {brand_name}: {e}")
 
     
     logger.info(f"✅ COMPLETED PROCESSING FOR {brand_name}")
@@ -3712,6 +4592,27 @@ def process_single_brand(brand_index: int):
 # ---------------------------
 # Job runner
 # ---------------------------
+# Brand worker threads are reused across scheduler cycles rather than rebuilt every run
+_BRAND_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_BRAND_EXECUTOR_LOCK = threading.Lock()
+
+
+def _get_brand_executor(max_workers: int) -> ThreadPoolExecutor:
+    global _BRAND_EXECUTOR
+    with _BRAND_EXECUTOR_LOCK:
+        if _BRAND_EXECUTOR is None:
+            _BRAND_EXECUTOR = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="brand")
+        return _BRAND_EXECUTOR
+
+
+def shutdown_brand_executor():
+    global _BRAND_EXECUTOR
+    with _BRAND_EXECUTOR_LOCK:
+        executor, _BRAND_EXECUTOR = _BRAND_EXECUTOR, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
 def run_data_pipeline():
     job_start_time = now_ist()
     logger.info(f"\n{'='*60}\nJOB TRIGGERED AT: {job_start_time.strftime('%Y-%m-%d %I:%M:%S %p')}\n{'='*60}")
@@ -3731,21 +4632,21 @@ def run_data_pipeline():
             logger.warning("No active brands match the current filters. Nothing to do.")
             return
 
-        max_workers = min(len(target_indices), max(2, CPU_COUNT // 2))
-        logger.info(f"Processing {len(target_indices)} brands with {max_workers} parallel workers")
+        # Sized for all active brands so a backfill-filtered first run doesn't pin it small
+        max_workers = min(len(active_brand_indices), max(2, CPU_COUNT // 2))
+        executor = _get_brand_executor(max_workers)
+        logger.info(f"Processing {len(target_indices)} brands with {min(len(target_indices), max_workers)} parallel workers")
 
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            logger.info(f"🚀 Starting {len(target_indices)} brand worker threads...")
-            futures = {executor.submit(process_single_brand, i): i for i in target_indices}
-            for fut in as_completed(futures):
-                idx = futures[fut]
-                name = os.environ.get(f"BRAND_NAME_{idx}", f"Brand_{idx}")
-                try:
-                    fut.result()
-                    logger.info(f"✅ Successfully completed brand: {name}")
-                except Exception as e:
-                    logger.error(f"❌ Failed processing brand {name}: {e}")
-                    traceback.print_exc()
+        logger.info(f"🚀 Starting {len(target_indices)} brand worker threads...")
+        futures = {executor.submit(process_single_brand, i): i for i in target_indices}
+        for fut in as_completed(futures):
+            idx = futures[fut]
+            name = os.environ.get(f"BRAND_NAME_{idx}", f"Brand_{idx}")
+            try:
+                fut.result()
+                logger.info(f"✅ Successfully completed brand: {name}")
+            except Exception as e:
+                logger.exception(f"❌ Failed processing brand {name}: {e}")
         
         logger.info("🏁 All brand worker threads have returned.")
 
@@ -3758,8 +4659,7 @@ def run_data_pipeline():
         trigger_pipeline_completion_webhook()
 
     except Exception as e:
-        logger.error(f"❌ PIPELINE FAILED with error: {e}")
-        traceback.print_exc()
+        logger.exception(f"❌ PIPELINE FAILED with error: {e}")
 
 
 # ---------------------------
@@ -3767,6 +4667,7 @@ def run_data_pipeline():
 # ---------------------------
 if __name__ == "__main__":
     initialize_brand_configs()
+    prewarm_async_runtime()
 
     scheduler = BackgroundScheduler(timezone=IST)
     scheduler.add_job(
@@ -3794,19 +4695,27 @@ if __name__ == "__main__":
     logger.info("   - Interval: Every 10 minutes")
     logger.info(f"   - Parallel workers: {min(len(active_brand_indices), max(2, CPU_COUNT // 2))}")
     logger.info("   - Connection pooling: Enabled (retry on exhaustion)")
-    logger.info("   - Async API fetching: Enabled")
+    logger.info("   - Async API fetching: Enabled (shared event loop + session)")
     logger.info("   - Summary updates: INCREMENTAL (only affected dates) 🚀")
 
+    # Block until SIGINT/SIGTERM instead of waking up every minute to sleep again
+    stop_event = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda signum, frame: stop_event.set())
     try:
-        while True:
-            time.sleep(60)
+        stop_event.wait()
     except (KeyboardInterrupt, SystemExit):
-        logger.info("Shutting down scheduler...")
-        scheduler.shutdown()
-        for i, engine in sqlalchemy_engines.items():
-            try:
-                engine.dispose()
-            except Exception:
-                pass
-        http_session.close()
-        logger.info("✅ Shutdown complete")
\ No newline at end of file
+        pass
+
+    logger.info("Shutting down scheduler...")
+    scheduler.shutdown()
+    shutdown_brand_executor()
+    for i, engine in sqlalchemy_engines.items():
+        try:
+            engine.dispose()
+        except Exception:
+            pass
+    http_session.close()
+    close_async_runtime()
+    shutdown_transform_pool()
+    logger.info("✅ Shutdown complete")
\ No newline at end of file